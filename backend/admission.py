@@ -0,0 +1,235 @@
+"""Admission control for voice sessions.
+
+At most VOICE_MAX_SESSIONS voice sessions (one upstream Deepgram socket each)
+run at once across every worker sharing the session store. The budget and
+the wait queue live in the store's admission state, so with
+VOICE_SESSION_STORE=sqlite the limit is global, not per worker.
+
+When the budget is spent, a new session is not held on a server thread.
+Instead it gets a ticket in a queue ordered by priority, then arrival, and
+an immediate 503 with Retry-After and its queue position. Retrying with the
+same session_id keeps the ticket. When a session ends, the slot is reserved
+for the ticket at the head of the queue for VOICE_ADMISSION_HOLD seconds.
+Tickets that are not retried within VOICE_ADMISSION_TIMEOUT are dropped.
+When the queue is full, an arrival sheds the least urgent ticket if it is
+more urgent itself, and is rejected otherwise.
+
+Each worker heartbeats into the admission state. Slots held by a worker
+whose heartbeat has gone stale (it crashed) are reclaimed.
+
+Audio POSTs are rate limited per session with an in-memory token bucket in
+the worker that owns the session, whichever worker received the POST, so
+the audio path never touches the shared state and the limit does not scale
+with the number of workers. Admitted sessions therefore keep their latency
+while new ones are shed.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import VOICE_ADMISSION_REJECTED, VOICE_ADMISSION_WAIT, VOICE_AUDIO_THROTTLED
+from session_store import SessionExists
+
+# Lower rank is admitted first
+PRIORITIES = {'critical': 0, 'high': 1, 'normal': 2, 'low': 3}
+
+# Idle token buckets beyond this are dropped, oldest first
+MAX_BUCKETS = 10000
+
+# Workers heartbeat this often; slots of a worker silent for OWNER_TTL are reclaimed
+HEARTBEAT_INTERVAL = 5.0
+OWNER_TTL = 30.0
+
+
+class AudioThrottled(Exception):
+    """An audio POST exceeded the session's rate; retry after `retry_after` seconds"""
+
+    def __init__(self, retry_after):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+class AdmissionRejected(Exception):
+    """A new session was not admitted; retry after `retry_after` seconds"""
+
+    def __init__(self, reason, retry_after, position=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+        self.position = position
+
+
+def retry_after_header(seconds):
+    """Retry-After takes whole seconds"""
+    return str(max(1, math.ceil(seconds)))
+
+
+def _owner():
+    # Evaluated per call: the controller may be created before a fork
+    return str(os.getpid())
+
+
+class AdmissionController:
+    def __init__(self, store, max_sessions=100, queue_size=50, ticket_ttl=10.0, hold=10.0,
+                 retry_after=2.0, audio_rate=25.0, audio_burst=50):
+        self.store = store
+        self.max_sessions = max_sessions
+        self.queue_size = queue_size
+        self.ticket_ttl = ticket_ttl
+        self.hold = hold
+        self.retry_after = retry_after
+        self.audio_rate = audio_rate
+        self.audio_burst = audio_burst
+
+        self.bucket_lock = threading.Lock()
+        self.buckets = OrderedDict()  # session_id -> [tokens, updated_at]
+
+    def _state(self, state, now):
+        """Fill in a fresh state, then drop expired entries and hand out free slots"""
+        active = state.setdefault('active', {})          # session_id -> owner
+        reserved = state.setdefault('reserved', {})      # session_id -> ticket
+        waiting = state.setdefault('waiting', [])        # tickets, most urgent first
+        heartbeats = state.setdefault('heartbeats', {})  # owner -> last heartbeat
+        state.setdefault('sequence', 0)
+
+        heartbeats[_owner()] = now
+        for owner, seen in list(heartbeats.items()):
+            if now - seen > OWNER_TTL:
+                del heartbeats[owner]
+                for session_id in [sid for sid, sid_owner in active.items() if sid_owner == owner]:
+                    del active[session_id]
+        for session_id in [sid for sid, ticket in reserved.items() if ticket['expires'] < now]:
+            del reserved[session_id]
+        waiting[:] = [ticket for ticket in waiting if ticket['expires'] >= now]
+
+        while waiting and len(active) + len(reserved) < self.max_sessions:
+            ticket = waiting.pop(0)
+            ticket['expires'] = now + self.hold
+            reserved[ticket['session_id']] = ticket
+        return active, reserved, waiting
+
+    def acquire(self, session_id, priority='normal'):
+        """Take a session slot for `session_id`
+
+        Raises SessionExists if the session already holds one, and
+        AdmissionRejected (with a queue position when queued) if it must wait.
+        """
+        now = time.time()
+        rank = PRIORITIES[priority]
+        rejection = None
+        with self.store.admission_state() as state:
+            active, reserved, waiting = self._state(state, now)
+            if session_id in active:
+                raise SessionExists(session_id)
+
+            ticket = reserved.pop(session_id, None)
+            if ticket is not None or (not waiting and len(active) + len(reserved) < self.max_sessions):
+                active[session_id] = _owner()
+                waited = now - ticket['enqueued'] if ticket else 0.0
+                VOICE_ADMISSION_WAIT.observe(waited, (ticket['priority'] if ticket else priority,))
+                return
+
+            ticket = next((t for t in waiting if t['session_id'] == session_id), None)
+            if ticket is not None:
+                # Retrying keeps the ticket alive
+                ticket['expires'] = now + self.ticket_ttl
+            else:
+                if len(waiting) >= self.queue_size:
+                    if not waiting or waiting[-1]['rank'] <= rank:
+                        rejection = 'queue_full'
+                    else:
+                        shed = waiting.pop()
+                        VOICE_ADMISSION_REJECTED.inc(1, ('shed', shed['priority']))
+                if rejection is None:
+                    state['sequence'] += 1
+                    ticket = {'session_id': session_id, 'rank': rank, 'priority': priority,
+                              'sequence': state['sequence'], 'enqueued': now,
+                              'expires': now + self.ticket_ttl}
+                    waiting.append(ticket)
+                    waiting.sort(key=lambda t: (t['rank'], t['sequence']))
+                    VOICE_ADMISSION_REJECTED.inc(1, ('queued', priority))
+            position = waiting.index(ticket) + 1 if rejection is None else None
+
+        # Raised outside the transaction so the new ticket is kept
+        if rejection is not None:
+            VOICE_ADMISSION_REJECTED.inc(1, (rejection, priority))
+        raise AdmissionRejected(rejection or 'queued', self.retry_after, position)
+
+    def release(self, session_id):
+        """Free the session's slot; the head of the queue gets it on its next retry"""
+        with self.bucket_lock:
+            self.buckets.pop(session_id, None)
+        with self.store.admission_state() as state:
+            state.setdefault('active', {}).pop(session_id, None)
+            self._state(state, time.time())
+
+    def heartbeat(self):
+        """Keep this worker's slots alive and reclaim those of dead workers"""
+        with self.store.admission_state() as state:
+            self._state(state, time.time())
+
+    def forget_owner(self):
+        """Release every slot held by this worker (called at exit)"""
+        with self.store.admission_state() as state:
+            active, _, _ = self._state(state, time.time())
+            owner = _owner()
+            for session_id in [sid for sid, sid_owner in active.items() if sid_owner == owner]:
+                del active[session_id]
+            state['heartbeats'].pop(owner, None)
+
+    def snapshot(self):
+        """Slots in use and queue depth, read without writing (metrics scrapes call this)
+
+        Entries that have expired, or belong to a worker whose heartbeat went
+        stale, are left out rather than cleaned up.
+        """
+        state = self.store.read_admission_state()
+        now = time.time()
+        live = {owner for owner, seen in state.get('heartbeats', {}).items() if now - seen <= OWNER_TTL}
+        active = sum(1 for owner in state.get('active', {}).values() if owner in live)
+        reserved = sum(1 for ticket in state.get('reserved', {}).values() if ticket['expires'] >= now)
+        waiting = sum(1 for ticket in state.get('waiting', []) if ticket['expires'] >= now)
+        return {'in_use': active + reserved, 'queue_depth': waiting}
+
+    def in_use(self):
+        return self.snapshot()['in_use']
+
+    def queue_depth(self):
+        return self.snapshot()['queue_depth']
+
+    def throttle(self, session_id):
+        """Take a token for one audio POST; returns 0, or seconds until one is available"""
+        if self.audio_rate <= 0:
+            return 0
+        now = time.monotonic()
+        with self.bucket_lock:
+            bucket = self.buckets.get(session_id)
+            if bucket is None:
+                bucket = self.buckets[session_id] = [float(self.audio_burst), now]
+                while len(self.buckets) > MAX_BUCKETS:
+                    self.buckets.popitem(last=False)
+            else:
+                self.buckets.move_to_end(session_id)
+                bucket[0] = min(float(self.audio_burst), bucket[0] + (now - bucket[1]) * self.audio_rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0
+            wait = (1 - bucket[0]) / self.audio_rate
+        VOICE_AUDIO_THROTTLED.inc()
+        return wait
+
+
+def create_admission_controller(store):
+    """Build the controller from the VOICE_* admission settings"""
+    return AdmissionController(
+        store,
+        max_sessions=int(os.getenv('VOICE_MAX_SESSIONS', '100')),
+        queue_size=int(os.getenv('VOICE_ADMISSION_QUEUE_SIZE', '50')),
+        ticket_ttl=float(os.getenv('VOICE_ADMISSION_TIMEOUT', '10')),
+        hold=float(os.getenv('VOICE_ADMISSION_HOLD', '10')),
+        retry_after=float(os.getenv('VOICE_ADMISSION_RETRY_AFTER', '2')),
+        audio_rate=float(os.getenv('VOICE_AUDIO_RATE', '25')),
+        audio_burst=int(os.getenv('VOICE_AUDIO_BURST', '50')))
@@ -1,111 +1,121 @@
-from flask import Flask, jsonify, request
-from flask_cors import CORS
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from flask import Flask, jsonify
 from dotenv import load_dotenv
 import os
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Flask app
-app = Flask(__name__)
-
-# Configure database
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///crisis_commune.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
-
-# Initialize extensions
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
-CORS(app)
-
-# Define models here to avoid circular imports
-from datetime import datetime
-from enum import Enum
-
-class IncidentStatus(Enum):
-    ACTIVE = "active"
-    RESOLVED = "resolved"
-    INVESTIGATING = "investigating"
-
-class AgentStatus(Enum):
-    ONLINE = "online"
-    OFFLINE = "offline"
-    BUSY = "busy"
-
-class Incident(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    title = db.Column(db.String(200), nullable=False)
-    description = db.Column(db.Text, nullable=True)
-    location = db.Column(db.String(200), nullable=True)
-    latitude = db.Column(db.Float, nullable=True)
-    longitude = db.Column(db.Float, nullable=True)
-    status = db.Column(db.Enum(IncidentStatus), default=IncidentStatus.ACTIVE)
-    priority = db.Column(db.Integer, default=1)  # 1-5 scale
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
-    # Relationships
-    logs = db.relationship('Log', backref='incident', lazy=True, cascade='all, delete-orphan')
-    agent_responses = db.relationship('AgentResponse', backref='incident', lazy=True, cascade='all, delete-orphan')
-
-class Agent(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
-    role = db.Column(db.String(100), nullable=False)
-    status = db.Column(db.Enum(AgentStatus), default=AgentStatus.OFFLINE)
-    capabilities = db.Column(db.JSON, nullable=True)  # Store capabilities as JSON
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
-    # Relationships
-    responses = db.relationship('AgentResponse', backref='agent', lazy=True, cascade='all, delete-orphan')
-
-class Log(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    incident_id = db.Column(db.Integer, db.ForeignKey('incident.id'), nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
-    level = db.Column(db.String(20), nullable=False)  # INFO, WARNING, ERROR, etc.
-    message = db.Column(db.Text, nullable=False)
-    source = db.Column(db.String(100), nullable=True)
-    log_metadata = db.Column(db.JSON, nullable=True)  # Store additional metadata as JSON
-
-class AgentResponse(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    incident_id = db.Column(db.Integer, db.ForeignKey('incident.id'), nullable=False)
-    agent_id = db.Column(db.Integer, db.ForeignKey('agent.id'), nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
-    response_type = db.Column(db.String(50), nullable=False)  # text, action, recommendation, etc.
-    content = db.Column(db.Text, nullable=False)
-    confidence = db.Column(db.Float, nullable=True)  # 0.0 to 1.0
-    response_metadata = db.Column(db.JSON, nullable=True)  # Store additional metadata as JSON
-
-# Import routes after models are defined
-from routes import *
-from deepgram_agent import create_voice_routes
-
-# Create voice routes
-create_voice_routes(app)
-
-@app.route('/api/health')
-def health_check():
-    """Health check endpoint"""
-    return jsonify({
-        'status': 'healthy',
-        'message': 'Crisis Commune API is running',
-        'deepgram_enabled': bool(os.getenv('DEEPGRAM_API_KEY'))
-    })
-
-@app.errorhandler(404)
-def not_found(error):
-    return jsonify({'error': 'Not found'}), 404
-
-@app.errorhandler(500)
-def internal_error(error):
-    db.session.rollback()
-    return jsonify({'error': 'Internal server error'}), 500
+# Structured logging through a background writer thread
+from logging_config import configure_logging
+configure_logging()
+
+from extensions import db, cors, init_migrate
+# Re-exported so `from app import db, Incident, ...` keeps working
+from models import Incident, Agent, Log, AgentResponse, IncidentStatus, AgentStatus
+from metrics import init_metrics
+from query_profiler import init_query_profiler
+from log_archive import init_log_retention
+
+
+def _env_flag(name, default):
+    return os.getenv(name, default).lower() == 'true'
+
+
+def create_app(config=None):
+    """Build and configure the Flask app
+
+    Startup only touches Flask, SQLAlchemy and the REST routes. The voice routes
+    are registered when VOICE_ENABLED is set, but the Deepgram SDK is imported
+    and its client constructed on the first voice request.
+    """
+    app = Flask(__name__)
+
+    # Configure database
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///crisis_commune.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
+
+    # Flask-Migrate is only needed by the `flask` CLI (`flask db upgrade`, ...)
+    app.config['MIGRATIONS_ENABLED'] = _env_flag('MIGRATIONS_ENABLED', os.getenv('FLASK_RUN_FROM_CLI', 'false'))
+
+    # Voice routes; disable for REST-only workers
+    app.config['VOICE_ENABLED'] = _env_flag('VOICE_ENABLED', 'true')
+
+    # Query profiler (development / staging only)
+    app.config['QUERY_PROFILER_ENABLED'] = _env_flag('QUERY_PROFILER_ENABLED', 'false')
+    app.config['QUERY_PROFILER_HEADERS'] = _env_flag('QUERY_PROFILER_HEADERS', 'true')
+    app.config['QUERY_PROFILER_WINDOW'] = int(os.getenv('QUERY_PROFILER_WINDOW', '200'))
+    app.config['QUERY_PROFILER_SLOW_QUERIES'] = int(os.getenv('QUERY_PROFILER_SLOW_QUERIES', '5'))
+    app.config['QUERY_PROFILER_N_PLUS_ONE_THRESHOLD'] = int(os.getenv('QUERY_PROFILER_N_PLUS_ONE_THRESHOLD', '5'))
+
+    # Log retention: move old / resolved-incident logs into archive segments
+    app.config['LOG_RETENTION_ENABLED'] = _env_flag('LOG_RETENTION_ENABLED', 'false')
+    app.config['LOG_RETENTION_MAX_AGE_DAYS'] = int(os.getenv('LOG_RETENTION_MAX_AGE_DAYS', '30'))
+    app.config['LOG_RETENTION_ARCHIVE_RESOLVED'] = _env_flag('LOG_RETENTION_ARCHIVE_RESOLVED', 'true')
+    app.config['LOG_RETENTION_INTERVAL'] = int(os.getenv('LOG_RETENTION_INTERVAL', '3600'))
+    app.config['LOG_ARCHIVE_DIR'] = os.getenv('LOG_ARCHIVE_DIR')
+    app.config['LOG_ARCHIVE_SEGMENT_ROWS'] = int(os.getenv('LOG_ARCHIVE_SEGMENT_ROWS', '100000'))
+    app.config['LOG_ARCHIVE_BLOCK_ROWS'] = int(os.getenv('LOG_ARCHIVE_BLOCK_ROWS', '1000'))
+    app.config['LOG_ARCHIVE_QUERY_LIMIT'] = int(os.getenv('LOG_ARCHIVE_QUERY_LIMIT', '10000'))
+
+    # Incident bundle export / import
+    app.config['EXPORT_BATCH_ROWS'] = int(os.getenv('EXPORT_BATCH_ROWS', '1000'))
+    app.config['IMPORT_CHUNK_ROWS'] = int(os.getenv('IMPORT_CHUNK_ROWS', '1000'))
+
+    # Prometheus metrics at /metrics
+    app.config['METRICS_ENABLED'] = _env_flag('METRICS_ENABLED', 'true')
+
+    if config:
+        app.config.update(config)
+
+    # Initialize extensions
+    db.init_app(app)
+    cors.init_app(app)
+    if app.config['MIGRATIONS_ENABLED']:
+        init_migrate(app)
+
+    from routes import api
+    from bundles import bundles
+    app.register_blueprint(api)
+    app.register_blueprint(bundles)
+
+    # Archive read path, `flask archive-logs` and the periodic retention thread
+    init_log_retention(app)
+
+    if app.config['VOICE_ENABLED']:
+        from deepgram_agent import create_voice_routes
+        create_voice_routes(app)
+
+    # Request, DB and voice metrics
+    init_metrics(app)
+
+    # Per-request query profiling (no-op unless QUERY_PROFILER_ENABLED=true)
+    init_query_profiler(app)
+
+    @app.route('/api/health')
+    def health_check():
+        """Health check endpoint"""
+        return jsonify({
+            'status': 'healthy',
+            'message': 'Crisis Commune API is running',
+            'deepgram_enabled': bool(os.getenv('DEEPGRAM_API_KEY')),
+            'voice_enabled': app.config['VOICE_ENABLED']
+        })
+
+    @app.errorhandler(404)
+    def not_found(error):
+        return jsonify({'error': 'Not found'}), 404
+
+    @app.errorhandler(500)
+    def internal_error(error):
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error'}), 500
+
+    return app
+
+
+# Module-level app for `python app.py`, `flask run` and `gunicorn app:app`
+app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,7 @@
+"""Load benchmarks for the Crisis Commune API.
+
+Run from the backend directory:
+
+    python -m benchmarks.seed --database sqlite:////tmp/bench.db
+    python -m benchmarks.load --database sqlite:////tmp/bench.db --output results.json
+"""
@@ -0,0 +1,45 @@
+"""Compare two benchmarks.load result files route by route.
+
+    python -m benchmarks.compare baseline.json candidate.json
+"""
+import argparse
+import json
+
+METRICS = ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms')
+
+
+def _delta(old, new):
+    if old is None or new is None:
+        return '-'
+    if old == 0:
+        return 'n/a'
+    return f'{(new - old) / old * 100:+.1f}%'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f'baseline:  {baseline["meta"].get("revision")} {baseline["meta"]["timestamp"]}')
+    print(f'candidate: {candidate["meta"].get("revision")} {candidate["meta"]["timestamp"]}')
+    print(f'{"route":<26}' + ''.join(f'{metric:>18}' for metric in METRICS))
+    for route in sorted(set(baseline['routes']) | set(candidate['routes'])):
+        old = baseline['routes'].get(route, {})
+        new = candidate['routes'].get(route, {})
+        cells = []
+        for metric in METRICS:
+            value = new.get(metric)
+            shown = f'{value:.2f}' if value is not None else '-'
+            cells.append(f'{shown} ({_delta(old.get(metric), value)})'.rjust(18))
+        print(f'{route:<26}' + ''.join(cells))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""Local stand-in for the Deepgram live transcription socket.
+
+Implements the parts of the SDK's live client that DeepgramVoiceAgent uses
+(`client.listen.live.v("1")`, `on`, `start`, `send`, `finish`) and replays
+recorded transcript events against the audio clock. An event recorded at audio
+offset t is delivered from a separate thread, like the SDK's callbacks, once
+t seconds of audio have been sent plus a configurable processing latency.
+
+Recordings are JSON lists of calls, each a list of events:
+
+    [[{"offset": 1.2, "duration": 1.2, "transcript": "there's a fire", "is_final": false}, ...], ...]
+
+Without a recording file, calls are synthesised from the example transcripts
+in frontend/src/data/transcript_examples.json at a normal speaking rate.
+"""
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from enum import Enum
+from types import SimpleNamespace
+
+# linear16, 16 kHz, mono -- matches the LiveOptions used by DeepgramVoiceAgent
+BYTES_PER_SECOND = 16000 * 2
+
+EXAMPLE_TRANSCRIPTS = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'frontend', 'src', 'data', 'transcript_examples.json')
+
+
+class LiveTranscriptionEvents(Enum):
+    Open = 'Open'
+    Close = 'Close'
+    Transcript = 'Results'
+    Metadata = 'Metadata'
+    UtteranceEnd = 'UtteranceEnd'
+    SpeechStarted = 'SpeechStarted'
+    Error = 'Error'
+
+
+class LiveOptions:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class StandInResult:
+    """Mimics the SDK's LiveResultResponse"""
+
+    def __init__(self, event):
+        self.event = event
+
+    def to_dict(self):
+        return {
+            'type': 'Results',
+            'start': self.event['offset'] - self.event.get('duration', 0.0),
+            'duration': self.event.get('duration', 0.0),
+            'is_final': self.event['is_final'],
+            'speech_final': self.event['is_final'],
+            'channel': {
+                'alternatives': [{
+                    'transcript': self.event['transcript'],
+                    'confidence': self.event.get('confidence', 0.98)
+                }]
+            }
+        }
+
+
+def synthesize_call(text, words_per_second=2.5, interim_every=3):
+    """Build interim and final events for `text`, one final per sentence"""
+    events = []
+    offset = 0.0
+    for sentence in re.split(r'(?<=[.!?])\s+', text.strip()):
+        words = sentence.split()
+        sentence_start = offset
+        for index in range(1, len(words) + 1):
+            offset += 1.0 / words_per_second
+            is_final = index == len(words)
+            if is_final or index % interim_every == 0:
+                events.append({
+                    'offset': round(offset, 3),
+                    'duration': round(offset - sentence_start, 3),
+                    'transcript': ' '.join(words[:index]),
+                    'is_final': is_final
+                })
+        # Pause between sentences
+        offset += 0.4
+    return events
+
+
+def load_recording(path=None):
+    """Return a list of calls, each a list of transcript events ordered by offset"""
+    if path:
+        with open(path) as f:
+            calls = json.load(f)
+    else:
+        with open(EXAMPLE_TRANSCRIPTS) as f:
+            examples = json.load(f)['transcripts']
+        calls = [synthesize_call(example['transcript']) for example in examples]
+    return [sorted(call, key=lambda event: event['offset']) for call in calls]
+
+
+def call_duration(call):
+    return call[-1]['offset'] if call else 0.0
+
+
+class StandInLiveConnection:
+    def __init__(self, events, latency):
+        self.events = events
+        self.latency = latency
+        self.handlers = {}
+        self.audio_bytes = 0
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def _emit(self, event, **kwargs):
+        for handler in self.handlers.get(event, []):
+            handler(self, **kwargs)
+
+    def start(self, options):
+        self.thread = threading.Thread(target=self._replay, name='deepgram-standin', daemon=True)
+        self.thread.start()
+        self._emit(LiveTranscriptionEvents.Open, open={'type': 'Open'})
+        return True
+
+    def send(self, data):
+        with self.condition:
+            if self.closed:
+                raise ConnectionError('connection is closed')
+            self.audio_bytes += len(data)
+            self.condition.notify()
+
+    def finish(self):
+        with self.condition:
+            if self.closed:
+                return True
+            self.closed = True
+            self.condition.notify()
+        self._emit(LiveTranscriptionEvents.Close, close={'type': 'Close'})
+        return True
+
+    def _replay(self):
+        for event in self.events:
+            with self.condition:
+                while not self.closed and self.audio_bytes / BYTES_PER_SECOND < event['offset']:
+                    self.condition.wait(0.1)
+                if self.closed:
+                    return
+            time.sleep(self.latency)
+            self._emit(LiveTranscriptionEvents.Transcript, result=StandInResult(event))
+
+
+class StandInDeepgramClient:
+    """Hands out replaying connections, cycling through the recorded calls"""
+
+    def __init__(self, recording, latency=0.15):
+        self.calls = itertools.cycle(recording)
+        self.lock = threading.Lock()
+        self.latency = latency
+        self.listen = SimpleNamespace(live=SimpleNamespace(v=self._live))
+
+    def _live(self, version):
+        with self.lock:
+            events = next(self.calls)
+        return StandInLiveConnection(events, self.latency)
+
+
+def install(agent_module, recording, latency=0.15):
+    """Point the module's global DeepgramVoiceAgent at the stand-in client"""
+    agent = agent_module.get_agent()
+    agent_module.DEEPGRAM_AVAILABLE = True
+    agent_module.LiveOptions = LiveOptions
+    agent_module.LiveTranscriptionEvents = LiveTranscriptionEvents
+    client = StandInDeepgramClient(recording, latency)
+    agent.client = client
+    return client
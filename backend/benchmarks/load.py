@@ -0,0 +1,451 @@
+"""Drive every API route at a configurable concurrency and report latency percentiles.
+
+By default the app is served in-process (werkzeug, threaded) against the
+benchmark database with the Deepgram stand-in installed, so the voice path can
+be exercised offline. Pass --base-url to benchmark an already running server
+instead, e.g. gunicorn serving benchmarks.standin_app:app.
+
+Each route runs as its own phase of --requests requests, followed by a voice
+phase where --voice-calls
+simulated callers start a session, stream audio in real time while polling
+their transcript, and stop. Results are printed and optionally written as JSON
+for benchmarks.compare.
+
+The unpaginated list endpoints load every row per request, so their phases
+run --list-requests requests one at a time. By default they only run against
+small datasets (up to LIST_PHASE_MAX_INCIDENTS incidents, e.g. --scale 0.01);
+at full scale each request takes minutes and several GB.
+
+Admission control answers 503 (session queued) and 429 (audio throttled)
+when the server is over budget. These are counted as shed, apart from
+errors and from the latency percentiles. A queued caller retries its start
+with the same session_id and a throttled chunk is resent. The in-process
+server is started without an admission budget or audio rate limit unless
+VOICE_MAX_SESSIONS / VOICE_AUDIO_RATE are set.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from benchmarks import deepgram_standin
+from benchmarks.seed import load_app
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+# Admission control turned the request away: not an error, and not a served latency
+SHED_STATUSES = (429, 503)
+
+# Wait between retries of a queued voice start or a throttled audio chunk
+RETRY_INTERVAL = 0.5
+
+# Largest dataset (by incident count) the list phases run against by default
+LIST_PHASE_MAX_INCIDENTS = 2_000
+DEFAULT_LIST_REQUESTS = 5
+
+
+class RouteStats:
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+        self.shed = 0
+        self.wall_time = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, status, latency):
+        with self.lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if status in SHED_STATUSES:
+                self.shed += 1
+                return
+            self.latencies.append(latency)
+            if status is None or status >= 500:
+                self.errors += 1
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+
+        def ms(value):
+            return round(value * 1000, 3) if value is not None else None
+
+        return {
+            'requests': count,
+            'errors': self.errors,
+            'shed': self.shed,
+            'statuses': {str(status): n for status, n in self.statuses.items()},
+            'throughput_rps': round(count / self.wall_time, 2) if self.wall_time else None,
+            'mean_ms': ms(sum(latencies) / count) if count else None,
+            'p50_ms': ms(percentile(latencies, 50)),
+            'p95_ms': ms(percentile(latencies, 95)),
+            'p99_ms': ms(percentile(latencies, 99)),
+            'max_ms': ms(latencies[-1]) if count else None
+        }
+
+
+class Client:
+    """Minimal HTTP client; one connection per request keeps workers independent"""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+
+    def request(self, method, path, body=None, content_type='application/json'):
+        headers = {}
+        if body is not None:
+            if content_type == 'application/json':
+                body = json.dumps(body).encode()
+            headers['Content-Type'] = content_type
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        started = time.perf_counter()
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            payload = response.read()
+            return response.status, time.perf_counter() - started, payload
+        except (OSError, http.client.HTTPException):
+            return None, time.perf_counter() - started, b''
+        finally:
+            connection.close()
+
+
+class Benchmark:
+    def __init__(self, client, args, max_incident_id, max_agent_id):
+        self.client = client
+        self.args = args
+        self.max_incident_id = max(1, max_incident_id)
+        self.max_agent_id = max(1, max_agent_id)
+        self.created_incidents = []
+        self.created_lock = threading.Lock()
+        self.results = {}
+
+    # Request factories: each returns (method, path, body)
+    def _incident_id(self, rng):
+        return rng.randint(1, self.max_incident_id)
+
+    def _agent_id(self, rng):
+        return rng.randint(1, self.max_agent_id)
+
+    def rest_routes(self):
+        """(name, request factory, is_list_endpoint) in execution order"""
+        return [
+            ('health', lambda rng: ('GET', '/api/health', None), False),
+            ('get_incident', lambda rng: ('GET', f'/api/incidents/{self._incident_id(rng)}', None), False),
+            ('create_incident', lambda rng: ('POST', '/api/incidents', {
+                'title': 'Benchmark incident', 'description': 'Created by benchmarks.load',
+                'location': 'Market St, San Francisco, CA', 'latitude': 37.77, 'longitude': -122.41,
+                'priority': rng.randint(1, 5)}), False),
+            ('update_incident', lambda rng: ('PUT', f'/api/incidents/{self._incident_id(rng)}', {
+                'priority': rng.randint(1, 5)}), False),
+            ('delete_incident', self._delete_incident_request, False),
+            ('create_agent', lambda rng: ('POST', '/api/agents', {
+                'name': 'Benchmark Agent', 'role': 'intake', 'capabilities': ['intake']}), False),
+            ('update_agent', lambda rng: ('PUT', f'/api/agents/{self._agent_id(rng)}', {
+                'status': rng.choice(['online', 'offline', 'busy'])}), False),
+            ('create_log', lambda rng: ('POST', '/api/logs', {
+                'incident_id': self._incident_id(rng), 'level': 'INFO',
+                'message': 'Benchmark log entry', 'source': 'benchmark', 'metadata': {'bench': True}}), False),
+            ('create_agent_response', lambda rng: ('POST', '/api/agent-responses', {
+                'incident_id': self._incident_id(rng), 'agent_id': self._agent_id(rng),
+                'response_type': 'text', 'content': 'Benchmark response', 'confidence': 0.9,
+                'metadata': {'bench': True}}), False),
+            ('process_emergency', lambda rng: ('POST', '/api/voice/process-emergency', {
+                'transcript': 'There is a fire on Market Street', 'session_id': 'bench'}), False),
+            ('list_agents', lambda rng: ('GET', '/api/agents', None), True),
+            ('list_incidents', lambda rng: ('GET', '/api/incidents', None), True),
+            ('list_agent_responses', lambda rng: ('GET', '/api/agent-responses', None), True),
+            ('list_logs', lambda rng: ('GET', '/api/logs', None), True),
+        ]
+
+    def _delete_incident_request(self, rng):
+        # Only delete incidents this run created so the seeded dataset stays intact
+        with self.created_lock:
+            incident_id = self.created_incidents.pop() if self.created_incidents else None
+        if incident_id is None:
+            return None
+        return 'DELETE', f'/api/incidents/{incident_id}', None
+
+    def run_phase(self, name, count, make_request, concurrency=None):
+        concurrency = concurrency or self.args.concurrency
+        stats = RouteStats(name)
+        counter = iter(range(count))
+        counter_lock = threading.Lock()
+
+        def worker(worker_id):
+            rng = random.Random(f'{name}-{worker_id}')
+            while True:
+                with counter_lock:
+                    if next(counter, None) is None:
+                        return
+                spec = make_request(rng)
+                if spec is None:
+                    return
+                method, path, body = spec
+                status, latency, payload = self.client.request(method, path, body)
+                stats.record(status, latency)
+                if name == 'create_incident' and status == 201:
+                    with self.created_lock:
+                        self.created_incidents.append(json.loads(payload)['id'])
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(worker, range(concurrency)))
+        stats.wall_time = time.perf_counter() - started
+        self.results[name] = stats.summary()
+        self._print_row(name, self.results[name])
+
+    def run_rest(self, selected):
+        for name, make_request, is_list in self.rest_routes():
+            if selected and name not in selected:
+                continue
+            if not is_list:
+                self.run_phase(name, self.args.requests, make_request)
+            elif self.args.list_requests:
+                # Each request materialises the whole table; running them in parallel only adds memory
+                self.run_phase(name, self.args.list_requests, make_request, concurrency=1)
+
+    def run_voice(self, recording):
+        args = self.args
+        chunk_bytes = int(deepgram_standin.BYTES_PER_SECOND * args.audio_chunk_ms / 1000)
+        chunk_interval = args.audio_chunk_ms / 1000.0 / args.speed
+        audio_seconds = max(deepgram_standin.call_duration(call) for call in recording) + 0.5
+        chunks_per_call = int(audio_seconds * 1000 / args.audio_chunk_ms) + 1
+        poll_every = max(1, int(args.poll_ms / args.audio_chunk_ms))
+        audio = os.urandom(chunk_bytes)
+
+        stats = {name: RouteStats(name) for name in ('voice_start', 'voice_audio', 'voice_transcript', 'voice_stop')}
+        first_transcript = []
+        first_lock = threading.Lock()
+        stream = TranscriptStreamReader(self.client)
+        stream.start()
+
+        def caller(call_index):
+            session_id = f'bench-{os.getpid()}-{call_index}'
+            deadline = time.perf_counter() + args.timeout
+            while True:
+                status, latency, _ = self.client.request('POST', '/api/voice/start', {'session_id': session_id})
+                stats['voice_start'].record(status, latency)
+                # Queued: retrying with the same session_id keeps the place in line
+                if status != 503 or time.perf_counter() >= deadline:
+                    break
+                time.sleep(RETRY_INTERVAL)
+            if status != 200:
+                return
+            started = time.perf_counter()
+            seen_transcript = False
+            next_send = time.perf_counter()
+            for chunk in range(chunks_per_call):
+                while True:
+                    status, latency, _ = self.client.request(
+                        'POST', f'/api/voice/audio/{session_id}', audio, 'application/octet-stream')
+                    stats['voice_audio'].record(status, latency)
+                    if status != 429:
+                        break
+                    # Throttled chunks were not accepted; resend rather than skip audio
+                    time.sleep(min(chunk_interval, RETRY_INTERVAL))
+                if chunk % poll_every == 0:
+                    status, latency, payload = self.client.request('GET', f'/api/voice/transcript/{session_id}')
+                    stats['voice_transcript'].record(status, latency)
+                    if not seen_transcript and status == 200:
+                        data = json.loads(payload)
+                        if data.get('transcript') or data.get('interim_transcript'):
+                            seen_transcript = True
+                            with first_lock:
+                                first_transcript.append(time.perf_counter() - started)
+                next_send += chunk_interval
+                time.sleep(max(0.0, next_send - time.perf_counter()))
+            status, latency, _ = self.client.request('POST', f'/api/voice/stop/{session_id}')
+            stats['voice_stop'].record(status, latency)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(caller, range(args.voice_calls)))
+        wall_time = time.perf_counter() - started
+        stream.stop()
+
+        for name, route_stats in stats.items():
+            route_stats.wall_time = wall_time
+            self.results[name] = route_stats.summary()
+            self._print_row(name, self.results[name])
+
+        stream_stats = stream.stats
+        stream_stats.wall_time = wall_time
+        self.results['voice_transcript_stream'] = stream_stats.summary()
+        self._print_row('voice_transcript_stream', self.results['voice_transcript_stream'])
+
+        first_transcript.sort()
+        return {
+            'calls': args.voice_calls,
+            'audio_seconds_per_call': round(audio_seconds, 3),
+            'speed': args.speed,
+            'time_to_first_transcript_ms': {
+                'p50': _ms(percentile(first_transcript, 50)),
+                'p95': _ms(percentile(first_transcript, 95)),
+                'p99': _ms(percentile(first_transcript, 99))
+            }
+        }
+
+    @staticmethod
+    def _print_row(name, summary):
+        def fmt(value):
+            return f'{value:>10.2f}' if value is not None else f'{"-":>10}'
+        print(f'{name:<26}{summary["requests"]:>8}{summary["errors"]:>7}{summary["shed"]:>6}'
+              f'{fmt(summary["throughput_rps"])}'
+              f'{fmt(summary["p50_ms"])}{fmt(summary["p95_ms"])}{fmt(summary["p99_ms"])}')
+
+
+class TranscriptStreamReader(threading.Thread):
+    """Consumes /api/voice/transcript-stream; latency is enqueue-to-receipt"""
+
+    def __init__(self, client):
+        super().__init__(name='transcript-stream-reader', daemon=True)
+        self.client = client
+        self.stats = RouteStats('voice_transcript_stream')
+        self.connection = None
+        self.stopped = threading.Event()
+
+    def run(self):
+        self.connection = http.client.HTTPConnection(self.client.host, self.client.port, timeout=5)
+        try:
+            self.connection.request('GET', '/api/voice/transcript-stream')
+            response = self.connection.getresponse()
+            while not self.stopped.is_set():
+                line = response.fp.readline()
+                if not line:
+                    return
+                if not line.startswith(b'data: '):
+                    continue
+                event = json.loads(line[6:])
+                if event.get('timestamp'):
+                    self.stats.record(response.status, max(0.0, time.time() - event['timestamp']))
+        except (OSError, http.client.HTTPException, ValueError):
+            return
+
+    def stop(self):
+        self.stopped.set()
+        if self.connection is not None:
+            self.connection.close()
+        self.join(timeout=5)
+
+
+def _ms(value):
+    return round(value * 1000, 3) if value is not None else None
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_server(app_module, recording, latency):
+    """Serve the app in-process with the Deepgram stand-in; returns the base URL"""
+    from werkzeug.serving import make_server
+    import deepgram_agent
+
+    deepgram_standin.install(deepgram_agent, recording, latency)
+    server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='bench-server', daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', default=os.getenv('BENCH_DATABASE_URL', 'sqlite:////tmp/crisis_commune_bench.db'))
+    parser.add_argument('--base-url', help='benchmark a running server instead of serving in-process')
+    parser.add_argument('--max-incident-id', type=int, default=100_000, help='with --base-url')
+    parser.add_argument('--max-agent-id', type=int, default=50, help='with --base-url')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=500, help='requests per route')
+    parser.add_argument('--list-requests', type=int,
+                        help='sequential requests per unpaginated list route (default: '
+                             f'{DEFAULT_LIST_REQUESTS} up to {LIST_PHASE_MAX_INCIDENTS} incidents, else skipped)')
+    parser.add_argument('--routes', help='comma-separated REST phases to run (default: all)')
+    parser.add_argument('--skip-rest', action='store_true')
+    parser.add_argument('--voice-calls', type=int, default=32)
+    parser.add_argument('--audio-chunk-ms', type=int, default=100)
+    parser.add_argument('--poll-ms', type=int, default=500)
+    parser.add_argument('--speed', type=float, default=1.0, help='audio playback speed relative to real time')
+    parser.add_argument('--deepgram-latency', type=float, default=0.15, help='stand-in processing latency (s)')
+    parser.add_argument('--recording', help='JSON transcript recording (default: synthesised examples)')
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--output', help='write results JSON here')
+    args = parser.parse_args()
+
+    recording = deepgram_standin.load_recording(args.recording)
+
+    if args.base_url:
+        base_url = args.base_url
+        max_incident_id, max_agent_id = args.max_incident_id, args.max_agent_id
+    else:
+        # Measure the routes themselves, not the admission budget, unless asked to
+        os.environ.setdefault('VOICE_MAX_SESSIONS', str(max(100, args.voice_calls)))
+        os.environ.setdefault('VOICE_AUDIO_RATE', '0')
+        app_module = load_app(args.database)
+        with app_module.app.app_context():
+            db = app_module.db
+            max_incident_id = db.session.query(db.func.max(app_module.Incident.id)).scalar() or 0
+            max_agent_id = db.session.query(db.func.max(app_module.Agent.id)).scalar() or 0
+        if not max_incident_id:
+            raise SystemExit(f'{args.database} has no incidents; run python -m benchmarks.seed first')
+        base_url = start_server(app_module, recording, args.deepgram_latency)
+
+    if args.list_requests is None:
+        args.list_requests = DEFAULT_LIST_REQUESTS if max_incident_id <= LIST_PHASE_MAX_INCIDENTS else 0
+        if not args.list_requests:
+            print(f'Skipping the unpaginated list routes at {max_incident_id} incidents; '
+                  'pass --list-requests to run them')
+
+    benchmark = Benchmark(Client(base_url, args.timeout), args, max_incident_id, max_agent_id)
+    print(f'Benchmarking {base_url} at concurrency {args.concurrency}')
+    print(f'{"route":<26}{"requests":>8}{"errors":>7}{"shed":>6}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}')
+
+    if not args.skip_rest:
+        selected = set(args.routes.split(',')) if args.routes else None
+        benchmark.run_rest(selected)
+    voice = benchmark.run_voice(recording) if args.voice_calls else None
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'revision': _git_revision(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'base_url': args.base_url or 'in-process',
+            'database': None if args.base_url else args.database,
+            'max_incident_id': max_incident_id,
+            'options': {key: value for key, value in vars(args).items() if key not in ('output', 'base_url', 'database')}
+        },
+        'routes': benchmark.results,
+        'voice': voice
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'Results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""Seed a benchmark database with a realistic volume of incidents, logs and agent responses.
+
+The default volume is 100k incidents, 5M logs and 1M agent responses. Pass
+--scale to shrink or grow every table proportionally (e.g. --scale 0.01 for a
+quick local run). Rows are generated from a fixed random seed so two runs
+against the same scale produce identical databases.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+DEFAULT_INCIDENTS = 100_000
+DEFAULT_LOGS = 5_000_000
+DEFAULT_AGENT_RESPONSES = 1_000_000
+DEFAULT_AGENTS = 50
+BATCH_SIZE = 10_000
+
+INCIDENT_TYPES = [
+    'Multi-Vehicle Traffic Collision', 'Structure Fire', 'Cardiac Arrest', 'Gas Leak',
+    'Flooding', 'Power Line Down', 'Hazmat Spill', 'Building Collapse', 'Missing Person',
+    'Wildfire', 'Water Rescue', 'Assault', 'Fall Injury', 'Smoke Investigation'
+]
+STREETS = [
+    'Market St', 'Mission St', 'Jefferson St', 'Van Ness Ave', 'Geary Blvd', 'Folsom St',
+    'Valencia St', 'Divisadero St', 'Lombard St', 'Castro St', '7th Ave', '19th Ave'
+]
+AGENT_ROLES = ['intake', 'geo', 'severity', 'dispatcher', 'medical', 'logistics']
+LOG_LEVELS = ['INFO'] * 80 + ['WARNING'] * 15 + ['ERROR'] * 5
+LOG_MESSAGES = [
+    'Processed emergency call audio', 'Geocoded incident location', 'Assessed severity level',
+    'Dispatched nearest unit', 'Unit en route', 'Unit arrived on scene', 'Requested backup',
+    'Updated caller with ETA', 'Hospital notified', 'Traffic rerouted around scene'
+]
+RESPONSE_TYPES = ['text', 'action', 'recommendation', 'dispatch']
+
+# Centre of the synthetic incident area (San Francisco)
+BASE_LATITUDE = 37.7749
+BASE_LONGITUDE = -122.4194
+
+
+def load_app(database_url):
+    """Import the Flask app against `database_url`"""
+    os.environ['DATABASE_URL'] = database_url
+    # Per-request access logs would dominate output and the log writer thread
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    import app as app_module
+    return app_module
+
+
+def _batched(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(connection, table, rows, label):
+    started = time.perf_counter()
+    count = 0
+    for batch in _batched(rows):
+        connection.execute(table.insert(), batch)
+        count += len(batch)
+    elapsed = time.perf_counter() - started
+    print(f'  {label}: {count:,} rows in {elapsed:.1f}s ({count / max(elapsed, 1e-9):,.0f} rows/s)')
+    return count
+
+
+def generate_agents(rng, count, now, AgentStatus):
+    statuses = list(AgentStatus)
+    for agent_id in range(1, count + 1):
+        role = AGENT_ROLES[(agent_id - 1) % len(AGENT_ROLES)]
+        yield {
+            'id': agent_id,
+            'name': f'{role.title()} Agent {agent_id}',
+            'role': role,
+            'status': rng.choice(statuses),
+            'capabilities': [role, 'triage'] if rng.random() < 0.5 else [role],
+            'created_at': now - timedelta(days=400),
+            'updated_at': now - timedelta(days=rng.randint(0, 30))
+        }
+
+
+def generate_incidents(rng, count, now, created_at, IncidentStatus):
+    # Most historical incidents are resolved; a small tail is still open
+    statuses = [IncidentStatus.RESOLVED] * 90 + [IncidentStatus.ACTIVE] * 6 + [IncidentStatus.INVESTIGATING] * 4
+    for incident_id in range(1, count + 1):
+        created = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+        created_at.append(created)
+        incident_type = rng.choice(INCIDENT_TYPES)
+        street = rng.choice(STREETS)
+        yield {
+            'id': incident_id,
+            'title': f'{incident_type} on {street}',
+            'description': f'Caller reported {incident_type.lower()} near {rng.randint(1, 2999)} {street}.',
+            'location': f'{rng.randint(1, 2999)} {street}, San Francisco, CA',
+            'latitude': BASE_LATITUDE + rng.uniform(-0.08, 0.08),
+            'longitude': BASE_LONGITUDE + rng.uniform(-0.08, 0.08),
+            'status': rng.choice(statuses),
+            'priority': rng.randint(1, 5),
+            'created_at': created,
+            'updated_at': created + timedelta(minutes=rng.randint(1, 600))
+        }
+
+
+def _pick_incident(rng, incident_count):
+    # Skew towards a subset of busy incidents, like real traffic
+    if rng.random() < 0.2:
+        return rng.randint(1, max(1, incident_count // 100))
+    return rng.randint(1, incident_count)
+
+
+def generate_logs(rng, count, created_at, agent_count):
+    incident_count = len(created_at)
+    for _ in range(count):
+        incident_id = _pick_incident(rng, incident_count)
+        yield {
+            'incident_id': incident_id,
+            'timestamp': created_at[incident_id - 1] + timedelta(seconds=rng.randint(0, 6 * 3600)),
+            'level': rng.choice(LOG_LEVELS),
+            'message': rng.choice(LOG_MESSAGES),
+            'source': f'agent-{rng.randint(1, agent_count)}',
+            'log_metadata': {'confidence': round(rng.uniform(0.5, 1.0), 2)}
+        }
+
+
+def generate_agent_responses(rng, count, created_at, agent_count):
+    incident_count = len(created_at)
+    for _ in range(count):
+        incident_id = _pick_incident(rng, incident_count)
+        response_type = rng.choice(RESPONSE_TYPES)
+        yield {
+            'incident_id': incident_id,
+            'agent_id': rng.randint(1, agent_count),
+            'timestamp': created_at[incident_id - 1] + timedelta(seconds=rng.randint(0, 6 * 3600)),
+            'response_type': response_type,
+            'content': f'{response_type.title()}: {rng.choice(LOG_MESSAGES)}',
+            'confidence': round(rng.uniform(0.4, 1.0), 3),
+            'response_metadata': {'latency_ms': rng.randint(50, 2500)}
+        }
+
+
+def seed(app_module, incidents, logs, agent_responses, agents=DEFAULT_AGENTS, reset=False, random_seed=42):
+    """Populate the app's database; returns a dict of row counts"""
+    rng = random.Random(random_seed)
+    now = datetime.utcnow()
+    db = app_module.db
+
+    with app_module.app.app_context():
+        if reset:
+            db.drop_all()
+        db.create_all()
+
+        if db.session.query(app_module.Incident.id).first() is not None:
+            raise SystemExit('Database already contains incidents; pass --reset to reseed it')
+
+        created_at = []
+        counts = {}
+        with db.engine.begin() as connection:
+            if db.engine.dialect.name == 'sqlite':
+                connection.exec_driver_sql('PRAGMA journal_mode=WAL')
+                connection.exec_driver_sql('PRAGMA synchronous=OFF')
+
+            counts['agents'] = _insert(
+                connection, app_module.Agent.__table__,
+                generate_agents(rng, agents, now, app_module.AgentStatus), 'agents')
+            counts['incidents'] = _insert(
+                connection, app_module.Incident.__table__,
+                generate_incidents(rng, incidents, now, created_at, app_module.IncidentStatus), 'incidents')
+            counts['logs'] = _insert(
+                connection, app_module.Log.__table__,
+                generate_logs(rng, logs, created_at, agents), 'logs')
+            counts['agent_responses'] = _insert(
+                connection, app_module.AgentResponse.__table__,
+                generate_agent_responses(rng, agent_responses, created_at, agents), 'agent responses')
+        return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', default=os.getenv('BENCH_DATABASE_URL', 'sqlite:////tmp/crisis_commune_bench.db'))
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply every table size by this factor')
+    parser.add_argument('--incidents', type=int, default=DEFAULT_INCIDENTS)
+    parser.add_argument('--logs', type=int, default=DEFAULT_LOGS)
+    parser.add_argument('--agent-responses', type=int, default=DEFAULT_AGENT_RESPONSES)
+    parser.add_argument('--agents', type=int, default=DEFAULT_AGENTS)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset', action='store_true', help='drop and recreate all tables first')
+    args = parser.parse_args()
+
+    app_module = load_app(args.database)
+    print(f'Seeding {args.database} (scale={args.scale})')
+    counts = seed(
+        app_module,
+        incidents=max(1, int(args.incidents * args.scale)),
+        logs=int(args.logs * args.scale),
+        agent_responses=int(args.agent_responses * args.scale),
+        agents=args.agents,
+        reset=args.reset,
+        random_seed=args.seed
+    )
+    print(f'Done: {counts}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+"""WSGI entry point serving the app with the Deepgram stand-in installed.
+
+Lets the voice path be load-tested under a real server, e.g.
+
+    BENCH_DATABASE_URL=sqlite:////tmp/crisis_commune_bench.db \
+        gunicorn -w 1 --threads 32 'benchmarks.standin_app:app'
+"""
+import os
+
+from benchmarks import deepgram_standin
+from benchmarks.seed import load_app
+
+_app_module = load_app(os.getenv('BENCH_DATABASE_URL', 'sqlite:////tmp/crisis_commune_bench.db'))
+
+import deepgram_agent
+
+deepgram_standin.install(
+    deepgram_agent,
+    deepgram_standin.load_recording(os.getenv('BENCH_RECORDING')),
+    float(os.getenv('BENCH_DEEPGRAM_LATENCY', '0.15'))
+)
+
+app = _app_module.app
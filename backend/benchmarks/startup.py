@@ -0,0 +1,107 @@
+"""Measure cold-start cost: import time, time to first REST response and first voice request.
+
+Each sample runs in a fresh interpreter so module caches don't hide import
+cost. Two configurations are measured: the default (voice routes registered,
+SDK loaded lazily) and a REST-only worker (VOICE_ENABLED=false). The report
+also records whether the Deepgram SDK was imported or ssl patched before
+the first voice request, which should never happen.
+
+    python -m benchmarks.startup --runs 10 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = r'''
+import json, ssl, sys, time
+original_ssl = ssl.create_default_context
+started = time.perf_counter()
+import app as app_module
+imported = time.perf_counter()
+client = app_module.app.test_client()
+client.get('/api/health')
+first_rest = time.perf_counter()
+result = {
+    'import_s': imported - started,
+    'first_rest_request_s': first_rest - imported,
+    'ready_s': first_rest - started,
+    'deepgram_imported_at_startup': 'deepgram' in sys.modules,
+    'deepgram_agent_imported_at_startup': 'deepgram_agent' in sys.modules,
+    'ssl_patched_at_startup': ssl.create_default_context is not original_ssl,
+}
+if app_module.app.config['VOICE_ENABLED']:
+    before = time.perf_counter()
+    client.get('/api/voice/transcript/startup-probe')
+    result['first_voice_request_s'] = time.perf_counter() - before
+print(json.dumps(result))
+'''
+
+
+def sample(voice_enabled, env):
+    child_env = dict(env, VOICE_ENABLED='true' if voice_enabled else 'false')
+    output = subprocess.check_output([sys.executable, '-c', CHILD], env=child_env, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(samples):
+    summary = {}
+    for key in samples[0]:
+        values = [s[key] for s in samples]
+        if isinstance(values[0], bool):
+            summary[key] = any(values)
+        else:
+            summary[key] = {
+                'median_ms': round(statistics.median(values) * 1000, 2),
+                'min_ms': round(min(values) * 1000, 2),
+                'max_ms': round(max(values) * 1000, 2)
+            }
+    return summary
+
+
+def import_profile(env, top):
+    """Slowest modules by cumulative import time (python -X importtime)"""
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                               env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        # "import time: <self us> | <cumulative us> | <module>"
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), name.strip()))
+    rows.sort(reverse=True)
+    return [{'module': name, 'cumulative_ms': round(us / 1000, 2)} for us, name in rows[:top]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--database', default='sqlite://', help='DATABASE_URL for the child processes')
+    parser.add_argument('--top-imports', type=int, default=15)
+    parser.add_argument('--output', help='write results JSON here')
+    args = parser.parse_args()
+
+    env = dict(os.environ, DATABASE_URL=args.database, LOG_LEVEL=os.getenv('LOG_LEVEL', 'WARNING'))
+    results = {}
+    for name, voice_enabled in (('default', True), ('rest_only', False)):
+        results[name] = summarize([sample(voice_enabled, env) for _ in range(args.runs)])
+        print(f'{name}:')
+        for key, value in results[name].items():
+            print(f'  {key:<36} {value}')
+
+    results['slowest_imports'] = import_profile(env, args.top_imports)
+    print('slowest imports (cumulative):')
+    for row in results['slowest_imports']:
+        print(f'  {row["cumulative_ms"]:>9.2f} ms  {row["module"]}')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'Results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
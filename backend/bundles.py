@@ -0,0 +1,421 @@
+"""Incident bundle export and bulk import.
+
+A bundle holds incidents together with their logs and agent responses, plus
+the agents those responses reference. It is a flat stream of records, each
+tagged with a ``type``: agents first, then each incident followed by its logs
+(including archived ones) and agent responses. Records use the same field
+names as the REST API.
+
+Exports stream from server-side cursors (yield_per) and are written out in
+batches, so memory use does not grow with export size. Incidents, logs and
+agent responses are each read by one query ordered by incident id and merged,
+and each archive segment is read once. Imports read the
+request body as a stream. They insert in chunks, committing one transaction
+per chunk, and give every row a new id. Incident and agent ids in the bundle
+are remapped to the new ones; agents are matched to existing agents by name
+and role before new ones are created.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy.exc import SQLAlchemyError
+
+from extensions import db
+from log_archive import log_key, parse_time_args
+from models import Agent, AgentResponse, AgentStatus, Incident, IncidentStatus, Log
+
+bundles = Blueprint('bundles', __name__, url_prefix='/api')
+
+CSV_FIELDS = [
+    'type', 'id', 'incident_id', 'agent_id', 'title', 'description', 'location', 'latitude', 'longitude',
+    'status', 'priority', 'name', 'role', 'capabilities', 'timestamp', 'level', 'message', 'source',
+    'response_type', 'content', 'confidence', 'metadata', 'created_at', 'updated_at'
+]
+# Stored as JSON inside a CSV cell
+CSV_JSON_FIELDS = ('capabilities', 'metadata')
+
+
+class BundleImportError(Exception):
+    """A bundle record could not be imported"""
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _enum_value(value):
+    return value.value if value else None
+
+
+def _agent_record(row):
+    return {
+        'type': 'agent',
+        'id': row.id,
+        'name': row.name,
+        'role': row.role,
+        'status': _enum_value(row.status),
+        'capabilities': row.capabilities,
+        'created_at': _iso(row.created_at),
+        'updated_at': _iso(row.updated_at)
+    }
+
+
+def _incident_record(row):
+    return {
+        'type': 'incident',
+        'id': row.id,
+        'title': row.title,
+        'description': row.description,
+        'location': row.location,
+        'latitude': row.latitude,
+        'longitude': row.longitude,
+        'status': _enum_value(row.status),
+        'priority': row.priority,
+        'created_at': _iso(row.created_at),
+        'updated_at': _iso(row.updated_at)
+    }
+
+
+def _log_record(row):
+    return {
+        'type': 'log',
+        'id': row.id,
+        'incident_id': row.incident_id,
+        'timestamp': _iso(row.timestamp),
+        'level': row.level,
+        'message': row.message,
+        'source': row.source,
+        'metadata': row.log_metadata
+    }
+
+
+def _agent_response_record(row):
+    return {
+        'type': 'agent_response',
+        'id': row.id,
+        'incident_id': row.incident_id,
+        'agent_id': row.agent_id,
+        'timestamp': _iso(row.timestamp),
+        'response_type': row.response_type,
+        'content': row.content,
+        'confidence': row.confidence,
+        'metadata': row.response_metadata
+    }
+
+
+def _stream(statement):
+    """Execute a Core select through a server-side cursor"""
+    batch_rows = current_app.config['EXPORT_BATCH_ROWS']
+    return db.session.execute(statement.execution_options(yield_per=batch_rows))
+
+
+class _IncidentCursor:
+    """Walks rows ordered by incident id in step with the incident stream"""
+
+    def __init__(self, rows, incident_id_of):
+        self.rows = iter(rows)
+        self.incident_id_of = incident_id_of
+        self.row = next(self.rows, None)
+
+    def take(self, incident_id):
+        """Yield the rows of `incident_id`, skipping any before it"""
+        while self.row is not None and self.incident_id_of(self.row) < incident_id:
+            self.row = next(self.rows, None)
+        while self.row is not None and self.incident_id_of(self.row) == incident_id:
+            yield self.row
+            self.row = next(self.rows, None)
+
+
+def iter_bundle(incident_filter, include_archived=True):
+    """Yield the bundle records for incidents matching `incident_filter`"""
+    incidents = Incident.__table__
+    logs = Log.__table__
+    responses = AgentResponse.__table__
+    agents = Agent.__table__
+
+    incident_ids = db.select(incidents.c.id).where(incident_filter)
+    agent_ids = db.select(responses.c.agent_id).where(responses.c.incident_id.in_(incident_ids))
+    for row in _stream(db.select(agents).where(agents.c.id.in_(agent_ids)).order_by(agents.c.id)):
+        yield _agent_record(row)
+
+    low, high = db.session.execute(
+        db.select(db.func.min(incidents.c.id), db.func.max(incidents.c.id)).where(incident_filter)).one()
+    if low is None:
+        return
+
+    hot_logs = _IncidentCursor(_stream(db.select(logs).where(logs.c.incident_id.in_(incident_ids))
+                                       .order_by(logs.c.incident_id, logs.c.id)), lambda row: row.incident_id)
+    agent_responses = _IncidentCursor(
+        _stream(db.select(responses).where(responses.c.incident_id.in_(incident_ids))
+                .order_by(responses.c.incident_id, responses.c.id)), lambda row: row.incident_id)
+    archive = current_app.extensions.get('log_archive') if include_archived else None
+    if archive is not None:
+        archived_logs = _IncidentCursor(archive.iter_incident_range(low, high), lambda row: row['incident_id'])
+        # Rows of an interrupted archive run are in both tiers; export the archived copy
+        pending = archive.pending_keys()
+
+    for incident in _stream(db.select(incidents).where(incident_filter).order_by(incidents.c.id)):
+        yield _incident_record(incident)
+        for row in hot_logs.take(incident.id):
+            record = _log_record(row)
+            if archive is None or log_key(record) not in pending:
+                yield record
+        if archive is not None:
+            for row in archived_logs.take(incident.id):
+                yield {'type': 'log', **row}
+        for row in agent_responses.take(incident.id):
+            yield _agent_response_record(row)
+
+
+def _ndjson_lines(records):
+    for record in records:
+        yield json.dumps(record, separators=(',', ':')) + '\n'
+
+
+def _csv_lines(records):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for record in records:
+        for field in CSV_JSON_FIELDS:
+            if record.get(field) is not None:
+                record[field] = json.dumps(record[field])
+        writer.writerow(record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _batched(lines, size):
+    """Join lines into larger chunks so the response isn't one write per row"""
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def _export_response(incident_filter, filename):
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    include_archived = request.args.get('include_archived', 'true').lower() == 'true'
+
+    records = iter_bundle(incident_filter, include_archived)
+    lines = _csv_lines(records) if export_format == 'csv' else _ndjson_lines(records)
+    body = _batched(lines, current_app.config['EXPORT_BATCH_ROWS'])
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={filename}.{export_format}'
+    })
+
+
+@bundles.route('/incidents/<int:incident_id>/export', methods=['GET'])
+def export_incident(incident_id):
+    """Stream one incident with its logs and agent responses"""
+    if db.session.get(Incident, incident_id) is None:
+        return jsonify({'error': 'Not found'}), 404
+    return _export_response(Incident.__table__.c.id == incident_id, f'incident-{incident_id}')
+
+
+@bundles.route('/incidents/export', methods=['GET'])
+def export_incidents():
+    """Stream every incident created in [since, until] with its logs and agent responses"""
+    try:
+        since, until = parse_time_args(request.args)
+    except ValueError:
+        return jsonify({'error': 'since and until must be ISO 8601 timestamps'}), 400
+
+    created_at = Incident.__table__.c.created_at
+    incident_filter = db.true()
+    if since is not None:
+        incident_filter = db.and_(incident_filter, created_at >= since)
+    if until is not None:
+        incident_filter = db.and_(incident_filter, created_at <= until)
+    return _export_response(incident_filter, 'incidents')
+
+
+def _scalar(record, field, types):
+    """record[field], rejecting JSON values of the wrong type before they reach a converter"""
+    value = record.get(field)
+    if value is not None and (isinstance(value, bool) or not isinstance(value, types)):
+        raise BundleImportError(f'{field} must be {" or ".join(t.__name__ for t in types)}, '
+                                f'not {type(value).__name__}')
+    return value
+
+
+def _ref(record, field):
+    """An id used to link records within the bundle"""
+    return _scalar(record, field, (int, str))
+
+
+def _parse_datetime(record, field):
+    value = _scalar(record, field, (str,))
+    return datetime.fromisoformat(value) if value else None
+
+
+def _optional(record, field, convert):
+    value = _scalar(record, field, (str, int, float))
+    return convert(value) if value not in (None, '') else None
+
+
+def _values(**values):
+    """Drop missing fields so column defaults apply"""
+    return {key: value for key, value in values.items() if value is not None}
+
+
+class BundleImporter:
+    """Inserts bundle records in chunks, remapping incident and agent ids"""
+
+    def __init__(self, chunk_rows):
+        self.chunk_rows = chunk_rows
+        self.incident_ids = {}
+        self.agent_ids = {}
+        self.pending_logs = []
+        self.pending_responses = []
+        self.pending_rows = 0
+        self.counts = {'incidents': 0, 'agents': 0, 'logs': 0, 'agent_responses': 0}
+        self.committed = dict(self.counts)
+        self.committed_incident_ids = {}
+
+    def add(self, record):
+        if not isinstance(record, dict):
+            raise BundleImportError(f'Expected a JSON object, got {type(record).__name__}')
+        kind = record.get('type')
+        if kind == 'incident':
+            self._add_incident(record)
+        elif kind == 'agent':
+            self._add_agent(record)
+        elif kind == 'log':
+            self.pending_logs.append(_values(
+                incident_id=self._incident_id(record),
+                timestamp=_parse_datetime(record, 'timestamp'),
+                level=record.get('level'),
+                message=record.get('message'),
+                source=record.get('source'),
+                log_metadata=record.get('metadata')))
+        elif kind == 'agent_response':
+            agent_id = _ref(record, 'agent_id')
+            if agent_id not in self.agent_ids:
+                raise BundleImportError(f'agent_response references agent {agent_id}, which is not in the bundle')
+            self.pending_responses.append(_values(
+                incident_id=self._incident_id(record),
+                agent_id=self.agent_ids[agent_id],
+                timestamp=_parse_datetime(record, 'timestamp'),
+                response_type=record.get('response_type'),
+                content=record.get('content'),
+                confidence=_optional(record, 'confidence', float),
+                response_metadata=record.get('metadata')))
+        else:
+            raise BundleImportError(f'Unknown record type: {kind}')
+
+        self.pending_rows += 1
+        if self.pending_rows >= self.chunk_rows:
+            self.commit()
+
+    def _incident_id(self, record):
+        incident_id = _ref(record, 'incident_id')
+        if incident_id not in self.incident_ids:
+            raise BundleImportError(
+                f'{record["type"]} references incident {incident_id}, which is not earlier in the bundle')
+        return self.incident_ids[incident_id]
+
+    def _add_incident(self, record):
+        result = db.session.execute(db.insert(Incident.__table__).values(_values(
+            title=record.get('title'),
+            description=record.get('description'),
+            location=record.get('location'),
+            latitude=_optional(record, 'latitude', float),
+            longitude=_optional(record, 'longitude', float),
+            status=_optional(record, 'status', IncidentStatus),
+            priority=_optional(record, 'priority', int),
+            created_at=_parse_datetime(record, 'created_at'),
+            updated_at=_parse_datetime(record, 'updated_at'))))
+        self.incident_ids[_ref(record, 'id')] = result.inserted_primary_key[0]
+        self.counts['incidents'] += 1
+
+    def _add_agent(self, record):
+        existing = db.session.execute(
+            db.select(Agent.id).where(Agent.name == record.get('name'), Agent.role == record.get('role'))
+        ).scalars().first()
+        if existing is not None:
+            self.agent_ids[_ref(record, 'id')] = existing
+            return
+        result = db.session.execute(db.insert(Agent.__table__).values(_values(
+            name=record.get('name'),
+            role=record.get('role'),
+            status=_optional(record, 'status', AgentStatus),
+            capabilities=record.get('capabilities'),
+            created_at=_parse_datetime(record, 'created_at'),
+            updated_at=_parse_datetime(record, 'updated_at'))))
+        self.agent_ids[_ref(record, 'id')] = result.inserted_primary_key[0]
+        self.counts['agents'] += 1
+
+    def commit(self):
+        """Write buffered rows and commit the chunk"""
+        if self.pending_logs:
+            db.session.execute(db.insert(Log.__table__), self.pending_logs)
+            self.counts['logs'] += len(self.pending_logs)
+        if self.pending_responses:
+            db.session.execute(db.insert(AgentResponse.__table__), self.pending_responses)
+            self.counts['agent_responses'] += len(self.pending_responses)
+        db.session.commit()
+        self.pending_logs = []
+        self.pending_responses = []
+        self.pending_rows = 0
+        self.committed = dict(self.counts)
+        self.committed_incident_ids = dict(self.incident_ids)
+
+
+def _ndjson_records(stream):
+    for line in io.TextIOWrapper(stream, encoding='utf-8'):
+        if line.strip():
+            yield json.loads(line)
+
+
+def _csv_records(stream):
+    for row in csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8', newline='')):
+        record = {key: value for key, value in row.items() if value != ''}
+        for field in ('id', 'incident_id', 'agent_id'):
+            if field in record:
+                record[field] = int(record[field])
+        for field in CSV_JSON_FIELDS:
+            if field in record:
+                record[field] = json.loads(record[field])
+        yield record
+
+
+@bundles.route('/incidents/import', methods=['POST'])
+def import_incidents():
+    """Bulk import an incident bundle (NDJSON or CSV, as produced by the export endpoints)"""
+    import_format = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'ndjson')
+    if import_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+
+    importer = BundleImporter(current_app.config['IMPORT_CHUNK_ROWS'])
+    records = _csv_records(request.stream) if import_format == 'csv' else _ndjson_records(request.stream)
+    position = 0
+    try:
+        for position, record in enumerate(records, 1):
+            importer.add(record)
+        importer.commit()
+    except (BundleImportError, ValueError, TypeError, KeyError, SQLAlchemyError) as e:
+        # Earlier chunks stay committed; `imported` and `incident_ids` describe them
+        db.session.rollback()
+        return jsonify({
+            'error': f'Import failed at record {position}: {e}',
+            'record': position,
+            'imported': importer.committed,
+            'incident_ids': {str(old): new for old, new in importer.committed_incident_ids.items()}
+        }), 400
+
+    return jsonify({
+        'imported': importer.counts,
+        'incident_ids': {str(old): new for old, new in importer.incident_ids.items()}
+    }), 201
@@ -1,53 +1,90 @@
 import asyncio
+import atexit
 import json
+import logging
 import os
 import ssl
 from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
 import threading
-import queue
 import time
 
-# Disable SSL verification globally for websockets (development only)
-# This fixes "CERTIFICATE_VERIFY_FAILED" errors on macOS
-import warnings
-warnings.filterwarnings('ignore', message='Unverified HTTPS request')
+from admission import (HEARTBEAT_INTERVAL, PRIORITIES, AdmissionController, AdmissionRejected, AudioThrottled,
+                       create_admission_controller, retry_after_header)
+from logging_config import RateLimiter, session_logger
+from metrics import (DEEPGRAM_CALLBACK_LATENCY, VOICE_ACTIVE_SESSIONS, VOICE_ADMISSION_IN_USE,
+                     VOICE_ADMISSION_QUEUE_DEPTH, VOICE_AUDIO_BYTES, VOICE_TRANSCRIPT_QUEUE_DEPTH)
+from session_rpc import OwnerTimeout, OwnerUnavailable, SessionRPCClient, SessionRPCServer
+from session_store import LocalSessionStore, SessionExists, create_session_store
 
-# Monkey-patch ssl to create unverified context by default
-_original_create_default_context = ssl.create_default_context
+logger = logging.getLogger(__name__)
 
-def _create_unverified_context(*args, **kwargs):
-    context = _original_create_default_context(*args, **kwargs)
-    context.check_hostname = False
-    context.verify_mode = ssl.CERT_NONE
-    return context
+# Per-chunk and per-transcript messages are emitted at most once per interval
+# per session; the suppressed count is reported with the next emitted message.
+HOT_PATH_LOG_INTERVAL = float(os.getenv('VOICE_LOG_INTERVAL', '5'))
+hot_path_limiter = RateLimiter(HOT_PATH_LOG_INTERVAL)
 
-ssl.create_default_context = _create_unverified_context
+# Sessions with no audio for this long (caller hung up without /stop) are finished
+SESSION_IDLE_TIMEOUT = float(os.getenv('VOICE_SESSION_IDLE_TIMEOUT', '60'))
 
-# Try to import Deepgram SDK but fail gracefully on SyntaxError / incompatible Python
+def _disable_ssl_verification():
+    """Disable SSL verification globally for websockets (development only)
+
+    This fixes "CERTIFICATE_VERIFY_FAILED" errors on macOS. Applied together
+    with the SDK import, so processes that never serve voice keep default ssl.
+    """
+    import warnings
+    warnings.filterwarnings('ignore', message='Unverified HTTPS request')
+
+    # Monkey-patch ssl to create unverified context by default
+    original_create_default_context = ssl.create_default_context
+
+    def create_unverified_context(*args, **kwargs):
+        context = original_create_default_context(*args, **kwargs)
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        return context
+
+    ssl.create_default_context = create_unverified_context
+
+# Deepgram SDK symbols, populated by load_deepgram_sdk() on first voice use
 DEEPGRAM_AVAILABLE = False
 DeepgramClient = None
+DeepgramClientOptions = None
 LiveTranscriptionEvents = None
 LiveOptions = None
-try:
-    try:
-        # Importing may raise SyntaxError on older Python versions if the SDK uses newer syntax
-        from deepgram import DeepgramClient, DeepgramClientOptions, LiveTranscriptionEvents, LiveOptions
-        DEEPGRAM_AVAILABLE = True
-    except Exception as _e:
-        # Import failed (could be SyntaxError or other incompatibility). We'll degrade gracefully.
-        print(f"Deepgram SDK not available or failed to import: {_e}")
-        DEEPGRAM_AVAILABLE = False
-except SyntaxError as se:
-    print(f"Deepgram SDK import raised SyntaxError (likely Python version incompatibility): {se}")
-    DEEPGRAM_AVAILABLE = False
+_sdk_loaded = False
+_sdk_lock = threading.Lock()
+
+def load_deepgram_sdk():
+    """Import the Deepgram SDK once; returns whether it is usable"""
+    global DEEPGRAM_AVAILABLE, DeepgramClient, DeepgramClientOptions, LiveTranscriptionEvents, LiveOptions
+    global _sdk_loaded
+    with _sdk_lock:
+        if _sdk_loaded:
+            return DEEPGRAM_AVAILABLE
+        _sdk_loaded = True
+        _disable_ssl_verification()
+        # Try to import Deepgram SDK but fail gracefully on SyntaxError / incompatible Python
+        try:
+            # Importing may raise SyntaxError on older Python versions if the SDK uses newer syntax
+            from deepgram import DeepgramClient, DeepgramClientOptions, LiveTranscriptionEvents, LiveOptions
+            DEEPGRAM_AVAILABLE = True
+        except Exception as e:
+            # Import failed (could be SyntaxError or other incompatibility). We'll degrade gracefully.
+            logger.warning("Deepgram SDK not available or failed to import: %s", e)
+            DEEPGRAM_AVAILABLE = False
+        return DEEPGRAM_AVAILABLE
+
+# Returned by DeepgramVoiceAgent._forward when no other worker owns the session
+_NOT_FORWARDED = object()
 
 class DeepgramVoiceAgent:
-    def __init__(self):
+    def __init__(self, store=None, admission=None):
         # Note: do not assume Deepgram SDK is importable. Initialize client only when available.
         self.api_key = os.getenv('DEEPGRAM_API_KEY', '')
         self.client = None
-        if DEEPGRAM_AVAILABLE and self.api_key:
+        if self.api_key and load_deepgram_sdk():
             try:
                 # SSL verification is already disabled globally via ssl.create_default_context patch
                 config = DeepgramClientOptions(
@@ -56,23 +93,88 @@ class DeepgramVoiceAgent:
                     }
                 )
                 self.client = DeepgramClient(self.api_key, config)
-                print("Deepgram client initialized successfully (SSL verification disabled for dev)")
-            except Exception as e:
-                print(f"Failed to initialize Deepgram client: {e}")
+                logger.info("Deepgram client initialized successfully (SSL verification disabled for dev)")
+            except Exception:
+                logger.exception("Failed to initialize Deepgram client")
                 self.client = None
 
-        self.connections = {}  # Store active connections by session_id
-        self.transcript_queue = queue.Queue()
+        self.connections = {}  # Store active connections owned by this worker, by session_id
+
+        # Session ownership and transcript events; shared across workers unless local
+        self.store = store or LocalSessionStore()
+        self.rpc_server = None
+        self.rpc_client = SessionRPCClient() if self.store.shared else None
+        self.rpc_lock = threading.Lock()
+
+        # Session budget, priority queue and audio rate limits for this worker
+        self.admission = admission or AdmissionController(self.store)
+        self.reaper = None
+
+    def _owner_address(self):
+        """Address other workers use to reach this one, starting the RPC server on first use"""
+        with self.rpc_lock:
+            if self.rpc_server is None:
+                self.rpc_server = SessionRPCServer(self)
+                self.rpc_server.start()
+                atexit.register(self.store.remove_owner, self.rpc_server.address)
+            return self.rpc_server.address
+
+    def _forward(self, session_id, op, payload=None, **kwargs):
+        """Run `op` on the worker that owns `session_id`
+
+        Returns _NOT_FORWARDED when the store is local, the session is unknown,
+        or this worker is the registered owner. Raises OwnerTimeout when the
+        owner is alive but did not answer.
+        """
+        if not self.store.shared:
+            return _NOT_FORWARDED
+        owner = self.store.owner(session_id)
+        if owner is None or (self.rpc_server is not None and owner == self.rpc_server.address):
+            return _NOT_FORWARDED
+        try:
+            return self.rpc_client.call(owner, op, session_id, payload, **kwargs)
+        except OwnerTimeout:
+            # The owner is alive but stuck; keep its registration and fail this call
+            session_logger(logger, session_id).warning(
+                "Voice session owner timed out", extra={'owner': owner})
+            raise
+        except OwnerUnavailable:
+            session_logger(logger, session_id).warning(
+                "Voice session owner unreachable; dropping registration", extra={'owner': owner})
+            self.store.remove(session_id, owner)
+            return _NOT_FORWARDED
         
-    def create_connection(self, session_id):
-        """Create a new Deepgram connection for a session"""
+    def _claim(self, session_id):
+        """Register this worker as the session's owner; raises SessionExists if it is live elsewhere"""
+        if session_id in self.connections:
+            raise SessionExists(session_id)
+        if not self.store.shared:
+            return
+        address = self._owner_address()
         try:
-            if not DEEPGRAM_AVAILABLE or not self.client:
-                print("Deepgram SDK not available or client not initialized. Cannot create connection.")
-                return False
+            self.store.register(session_id, address)
+        except SessionExists:
+            # A registration left by a worker that died is dropped by _forward
+            try:
+                if self._forward(session_id, 'get_transcript') is not _NOT_FORWARDED or self.store.owner(session_id):
+                    raise
+            except OwnerTimeout:
+                # Alive but stuck: the session is still held there
+                raise SessionExists(session_id)
+            self.store.register(session_id, address)
 
-            print(f"Creating Deepgram connection for session: {session_id}")
-            print(f"Using API key: {self.api_key[:10]}...")
+    def create_connection(self, session_id):
+        """Create a new Deepgram connection for a session
+
+        Raises SessionExists if the session id is already in use.
+        """
+        log = session_logger(logger, session_id)
+        if not DEEPGRAM_AVAILABLE or not self.client:
+            log.warning("Deepgram SDK not available or client not initialized. Cannot create connection.")
+            return False
+        self._claim(session_id)
+        try:
+            log.info("Creating Deepgram connection")
 
             # Configure for browser MediaRecorder audio
             # Note: Browser sends webm container, but we configure for the codec inside (opus)
@@ -98,27 +200,39 @@ class DeepgramVoiceAgent:
             connection.on(LiveTranscriptionEvents.Close, self.on_close)
 
             if connection.start(options):
-                print(f"Deepgram connection started successfully for session: {session_id}")
+                log.info("Deepgram connection started")
                 self.connections[session_id] = {
                     'connection': connection,
                     'transcript': '',
                     'interim_transcript': '',
                     'is_listening': False,
-                    'created_at': time.time()
+                    'created_at': time.time(),
+                    'last_activity': time.monotonic(),
+                    'audio_chunks': 0,
+                    'audio_bytes': 0,
+                    'log': log
                 }
                 return True
             else:
-                print(f"Failed to start Deepgram connection for session: {session_id}")
-                return False
-        except Exception as e:
-            print(f"Error creating Deepgram connection: {e}")
-            return False
+                log.error("Failed to start Deepgram connection")
+        except Exception:
+            log.exception("Error creating Deepgram connection")
+        if self.store.shared:
+            self.store.remove(session_id, self.rpc_server.address)
+        return False
     
     def on_open(self, *args, **kwargs):
-        print("Deepgram connection opened")
+        logger.info("Deepgram connection opened")
     
     def on_transcript(self, *args, **kwargs):
         """Handle transcript results"""
+        started = time.perf_counter()
+        try:
+            self._handle_transcript(*args, **kwargs)
+        finally:
+            DEEPGRAM_CALLBACK_LATENCY.observe(time.perf_counter() - started, ('transcript',))
+
+    def _handle_transcript(self, *args, **kwargs):
         try:
             # In Deepgram SDK v3+, result is a LiveResultResponse object, not a dict
             result = kwargs.get('result')
@@ -140,10 +254,7 @@ class DeepgramVoiceAgent:
                     if 'alternatives' in channel and len(channel['alternatives']) > 0:
                         alternative = channel['alternatives'][0]
                         transcript = alternative.get('transcript', '')
-                        
-                # Only log when we actually have text
-                if transcript:
-                    print(f"🎤 Transcript: '{transcript}' (final={is_final})")
+
             else:
                 # Fallback: try object attribute access if to_dict doesn't exist
                 is_final = getattr(result, 'is_final', False)
@@ -153,8 +264,6 @@ class DeepgramVoiceAgent:
                         alternative = channel.alternatives[0]
                         if hasattr(alternative, 'transcript'):
                             transcript = alternative.transcript
-                            if transcript:
-                                print(f"🎤 Transcript: '{transcript}' (final={is_final})")
             
             # Only continue processing if we have actual transcript text
             if not transcript:
@@ -173,64 +282,164 @@ class DeepgramVoiceAgent:
                     session_id = list(self.connections.keys())[0]
             
             if session_id:
+                suppressed = hot_path_limiter.check((session_id, 'transcript'))
+                if suppressed is not None:
+                    self.connections[session_id]['log'].info(
+                        "Transcript received: %r", transcript,
+                        extra={'is_final': is_final, 'suppressed': suppressed})
+
                 if is_final:
                     self.connections[session_id]['transcript'] += transcript + ' '
                     self.connections[session_id]['interim_transcript'] = ''
                 else:
                     self.connections[session_id]['interim_transcript'] = transcript
                 
-                # Put transcript data in queue for processing
-                self.transcript_queue.put({
+                # Publish for /api/voice/transcript-stream readers in any worker
+                self.store.publish({
                     'session_id': session_id,
                     'transcript': transcript,
                     'is_final': is_final,
                     'timestamp': time.time()
                 })
                 
-        except Exception as e:
-            import traceback
-            print(f"Error processing transcript: {e}")
-            traceback.print_exc()
+        except Exception:
+            suppressed = hot_path_limiter.check('transcript_error')
+            if suppressed is not None:
+                logger.exception("Error processing transcript", extra={'suppressed': suppressed})
     
     def on_metadata(self, *args, **kwargs):
-        print(f"Metadata: {kwargs}")
+        logger.debug("Deepgram metadata: %s", kwargs)
     
+    def _unfinished_session_for(self, connection):
+        """Session using `connection`, unless finish_connection is already closing it"""
+        for session_id, conn_data in list(self.connections.items()):
+            if conn_data['connection'] is connection and not conn_data.get('finishing'):
+                return session_id
+        return None
+
     def on_error(self, *args, **kwargs):
-        print(f"Deepgram error: {kwargs}")
+        session_id = self._unfinished_session_for(args[0]) if args else None
+        logger.error("Deepgram error: %s", kwargs, extra={'session_id': session_id})
+        if session_id is not None:
+            self._drop_session(session_id, "Voice session dropped after Deepgram error")
+            # finish() may join the SDK thread this callback runs on
+            threading.Thread(target=args[0].finish, name='deepgram-finish', daemon=True).start()
     
     def on_close(self, *args, **kwargs):
-        print("Deepgram connection closed")
+        logger.info("Deepgram connection closed")
+        # Deepgram closed the socket (idle, error) without a /stop from the caller
+        session_id = self._unfinished_session_for(args[0]) if args else None
+        if session_id is not None:
+            self._drop_session(session_id, "Deepgram closed the connection")
+
+    def _drop_session(self, session_id, message):
+        """Forget a session and free its slot; safe to call more than once"""
+        conn_data = self.connections.pop(session_id, None)
+        if conn_data is None:
+            return
+        try:
+            self.admission.release(session_id)
+            if self.store.shared:
+                self.store.remove(session_id, self.rpc_server.address)
+        finally:
+            conn_data['log'].info(message, extra={
+                'audio_chunks': conn_data['audio_chunks'],
+                'audio_bytes': conn_data['audio_bytes'],
+                'duration_s': round(time.time() - conn_data['created_at'], 3)
+            })
+            for key in ('transcript', 'audio', 'audio_error'):
+                hot_path_limiter.forget((session_id, key))
+
+    def start_reaper(self):
+        """Heartbeat the admission state and finish idle sessions in the background"""
+        self.reaper = threading.Thread(target=self._reap_loop, name='voice-reaper', daemon=True)
+        self.reaper.start()
+        atexit.register(self.admission.forget_owner)
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(min(HEARTBEAT_INTERVAL, SESSION_IDLE_TIMEOUT / 4))
+            try:
+                self.admission.heartbeat()
+                now = time.monotonic()
+                for session_id, conn_data in list(self.connections.items()):
+                    if now - conn_data['last_activity'] > SESSION_IDLE_TIMEOUT:
+                        conn_data['log'].warning("Finishing idle voice session",
+                                                 extra={'idle_timeout_s': SESSION_IDLE_TIMEOUT})
+                        self.finish_connection(session_id, forward=False)
+            except Exception:
+                logger.exception("Voice session reaper failed")
     
-    def send_audio(self, session_id, audio_data):
-        """Send audio data to Deepgram"""
-        if session_id in self.connections:
+    def send_audio(self, session_id, audio_data, forward=True):
+        """Send audio data to Deepgram
+
+        Raises AudioThrottled when the session is over its audio rate. The
+        limit is applied here in the owning worker, so forwarded POSTs share
+        one bucket per session.
+        """
+        conn_data = self.connections.get(session_id)
+        if conn_data is None and forward:
+            result = self._forward(session_id, 'send_audio', audio_data)
+            if result is not _NOT_FORWARDED:
+                return result
+        if conn_data is not None:
+            log = conn_data['log']
+            wait = self.admission.throttle(session_id)
+            if wait:
+                raise AudioThrottled(wait)
             try:
-                print(f"Sending {len(audio_data)} bytes of audio data for session {session_id}")
-                self.connections[session_id]['connection'].send(audio_data)
+                conn_data['connection'].send(audio_data)
+                conn_data['last_activity'] = time.monotonic()
+                VOICE_AUDIO_BYTES.inc(len(audio_data))
+                conn_data['audio_chunks'] += 1
+                conn_data['audio_bytes'] += len(audio_data)
+                # Skip the limiter's lock entirely when DEBUG is off (the default)
+                suppressed = (hot_path_limiter.check((session_id, 'audio'))
+                              if log.isEnabledFor(logging.DEBUG) else None)
+                if suppressed is not None:
+                    log.debug("Forwarded audio to Deepgram", extra={
+                        'audio_chunks': conn_data['audio_chunks'],
+                        'audio_bytes': conn_data['audio_bytes']
+                    })
                 return True
-            except Exception as e:
-                print(f"Error sending audio: {e}")
-                import traceback
-                traceback.print_exc()
+            except Exception:
+                suppressed = hot_path_limiter.check((session_id, 'audio_error'))
+                if suppressed is not None:
+                    log.exception("Error sending audio", extra={'suppressed': suppressed})
                 return False
         else:
-            print(f"Session {session_id} not found in connections: {list(self.connections.keys())}")
+            suppressed = hot_path_limiter.check('unknown_session')
+            if suppressed is not None:
+                session_logger(logger, session_id).warning(
+                    "Audio for unknown session", extra={'suppressed': suppressed})
         return False
     
-    def finish_connection(self, session_id):
+    def finish_connection(self, session_id, forward=True):
         """Finish and close a Deepgram connection"""
-        if session_id in self.connections:
+        if session_id not in self.connections and forward:
+            result = self._forward(session_id, 'finish_connection')
+            if result is not _NOT_FORWARDED:
+                return result
+        conn_data = self.connections.get(session_id)
+        if conn_data is not None:
+            conn_data['finishing'] = True
             try:
-                self.connections[session_id]['connection'].finish()
-                del self.connections[session_id]
+                conn_data['connection'].finish()
                 return True
-            except Exception as e:
-                print(f"Error finishing connection: {e}")
+            except Exception:
+                conn_data['log'].exception("Error finishing connection")
                 return False
+            finally:
+                # The slot is freed even if the socket didn't close cleanly
+                self._drop_session(session_id, "Deepgram connection finished")
         return False
     
-    def get_transcript(self, session_id):
+    def get_transcript(self, session_id, forward=True):
         """Get current transcript for a session"""
+        if session_id not in self.connections and forward:
+            result = self._forward(session_id, 'get_transcript')
+            if result is not _NOT_FORWARDED:
+                return result
         if session_id in self.connections:
             conn_data = self.connections[session_id]
             return {
@@ -240,38 +449,106 @@ class DeepgramVoiceAgent:
             }
         return None
     
-    def set_listening_state(self, session_id, is_listening):
+    def set_listening_state(self, session_id, is_listening, forward=True):
         """Set listening state for a session"""
+        if session_id not in self.connections and forward:
+            result = self._forward(session_id, 'set_listening_state', is_listening=is_listening)
+            if result is not _NOT_FORWARDED:
+                return result
         if session_id in self.connections:
             self.connections[session_id]['is_listening'] = is_listening
             return True
         return False
 
-# Global Deepgram agent instance (created when routes are registered)
+# Global Deepgram agent instance (created by the first voice request)
 deepgram_agent = None
+_agent_lock = threading.Lock()
 
-def create_voice_routes(app):
-    """Create voice-related API routes"""
+def get_agent():
+    """Return the process-wide DeepgramVoiceAgent, creating it on first use"""
     global deepgram_agent
-    # Instantiate deepgram agent lazily so importing this module doesn't fail on incompatible SDK
     if deepgram_agent is None:
-        deepgram_agent = DeepgramVoiceAgent()
+        with _agent_lock:
+            if deepgram_agent is None:
+                store = create_session_store()
+                agent = DeepgramVoiceAgent(store, create_admission_controller(store))
+                agent.start_reaper()
+                VOICE_ACTIVE_SESSIONS.set_function(lambda: len(agent.connections))
+                VOICE_TRANSCRIPT_QUEUE_DEPTH.set_function(agent.store.queue_depth)
+                VOICE_ADMISSION_IN_USE.set_function(agent.admission.in_use)
+                VOICE_ADMISSION_QUEUE_DEPTH.set_function(agent.admission.queue_depth)
+                deepgram_agent = agent
+    return deepgram_agent
+
+def create_voice_routes(app):
+    """Create voice-related API routes"""
+    # The agent (and with it the Deepgram SDK) is created by the first voice
+    # request, so registering routes costs nothing at startup.
     
+    def owner_timeout():
+        """The session lives on a worker that did not answer in time"""
+        return jsonify({
+            'success': False,
+            'message': 'Voice session owner did not respond in time'
+        }), 504
+
     @app.route('/api/voice/start', methods=['POST'])
     def start_voice_session():
-        """Start a new voice session"""
+        """Start a new voice session
+
+        At VOICE_MAX_SESSIONS the caller is queued and gets a 503 with
+        Retry-After; an optional `priority` (critical, high, normal, low)
+        orders the queue.
+        """
         try:
             data = request.get_json()
             session_id = data.get('session_id', f'session_{int(time.time())}')
+            priority = data.get('priority', 'normal')
+            if priority not in PRIORITIES:
+                return jsonify({
+                    'success': False,
+                    'message': f'Unknown priority: {priority}'
+                }), 400
             
-            if deepgram_agent.create_connection(session_id):
-                deepgram_agent.set_listening_state(session_id, True)
+            agent = get_agent()
+            try:
+                agent.admission.acquire(session_id, priority)
+            except AdmissionRejected as e:
+                session_logger(logger, session_id).info(
+                    "Voice session not admitted",
+                    extra={'reason': e.reason, 'priority': priority, 'position': e.position})
+                body = {
+                    'success': False,
+                    'message': 'Voice capacity exhausted; retry with the same session_id to keep your place',
+                    'reason': e.reason
+                }
+                if e.position is not None:
+                    body['position'] = e.position
+                return jsonify(body), 503, {'Retry-After': retry_after_header(e.retry_after)}
+            except SessionExists:
+                return jsonify({
+                    'success': False,
+                    'message': 'Voice session already exists'
+                }), 409
+
+            try:
+                started = agent.create_connection(session_id)
+            except SessionExists:
+                agent.admission.release(session_id)
+                return jsonify({
+                    'success': False,
+                    'message': 'Voice session already exists'
+                }), 409
+
+            if started:
+                agent.set_listening_state(session_id, True)
                 return jsonify({
                     'success': True,
                     'session_id': session_id,
                     'message': 'Voice session started'
                 })
             else:
+                agent.admission.release(session_id)
                 return jsonify({
                     'success': False,
                     'message': 'Failed to start voice session'
@@ -289,7 +566,7 @@ def create_voice_routes(app):
         try:
             audio_data = request.data
             
-            if deepgram_agent.send_audio(session_id, audio_data):
+            if get_agent().send_audio(session_id, audio_data):
                 return jsonify({'success': True})
             else:
                 return jsonify({
@@ -297,6 +574,13 @@ def create_voice_routes(app):
                     'message': 'Failed to send audio data'
                 }), 400
                 
+        except AudioThrottled as e:
+            return jsonify({
+                'success': False,
+                'message': 'Audio rate limit exceeded'
+            }), 429, {'Retry-After': retry_after_header(e.retry_after)}
+        except OwnerTimeout:
+            return owner_timeout()
         except Exception as e:
             return jsonify({
                 'success': False,
@@ -307,7 +591,7 @@ def create_voice_routes(app):
     def get_transcript(session_id):
         """Get current transcript for a session"""
         try:
-            transcript_data = deepgram_agent.get_transcript(session_id)
+            transcript_data = get_agent().get_transcript(session_id)
             
             if transcript_data:
                 return jsonify({
@@ -322,6 +606,8 @@ def create_voice_routes(app):
                     'message': 'Session not found'
                 }), 404
                 
+        except OwnerTimeout:
+            return owner_timeout()
         except Exception as e:
             return jsonify({
                 'success': False,
@@ -332,7 +618,7 @@ def create_voice_routes(app):
     def stop_voice_session(session_id):
         """Stop and close a voice session"""
         try:
-            if deepgram_agent.finish_connection(session_id):
+            if get_agent().finish_connection(session_id):
                 return jsonify({
                     'success': True,
                     'message': 'Voice session stopped'
@@ -343,6 +629,8 @@ def create_voice_routes(app):
                     'message': 'Session not found or already closed'
                 }), 404
                 
+        except OwnerTimeout:
+            return owner_timeout()
         except Exception as e:
             return jsonify({
                 'success': False,
@@ -353,16 +641,12 @@ def create_voice_routes(app):
     def stream_transcripts():
         """Stream transcript updates via Server-Sent Events"""
         def generate():
-            while True:
-                try:
-                    # Get transcript data from queue
-                    transcript_data = deepgram_agent.transcript_queue.get(timeout=1)
-                    yield f"data: {json.dumps(transcript_data)}\n\n"
-                except queue.Empty:
-                    yield "data: {}\n\n"  # Keep connection alive
-                except Exception as e:
-                    print(f"Error in transcript stream: {e}")
-                    break
+            try:
+                for transcript_data in get_agent().store.stream():
+                    # None means nothing arrived within the idle timeout
+                    yield f"data: {json.dumps(transcript_data or {})}\n\n"  # Empty event keeps connection alive
+            except Exception:
+                logger.exception("Error in transcript stream")
         
         return Response(generate(), mimetype='text/event-stream', headers={
             'Cache-Control': 'no-cache',
@@ -0,0 +1,16 @@
+from flask_cors import CORS
+from flask_sqlalchemy import SQLAlchemy
+
+# Extensions are created unbound and attached to an app in create_app()
+db = SQLAlchemy()
+cors = CORS()
+
+
+def init_migrate(app):
+    """Attach Flask-Migrate to `app`
+
+    Alembic accounts for a large share of import time and is only used by the
+    `flask db` commands, so it is imported here rather than at module level.
+    """
+    from flask_migrate import Migrate
+    return Migrate(app, db)
@@ -0,0 +1,491 @@
+"""Tiered log retention: move old logs out of the hot table into archive segments.
+
+Logs older than LOG_RETENTION_MAX_AGE_DAYS, and logs belonging to resolved
+incidents, are written to append-only segment files and then deleted from the
+``log`` table. A segment is a series of independently gzip-compressed NDJSON
+blocks (so the file as a whole is a valid multi-member gzip, readable with
+zcat). Each block has an entry in ``index.json`` with its byte range, incident
+id range and time range.
+
+Reads map the segment files into memory and only decompress blocks whose
+ranges match the query. Nothing is ever rewritten: new archives add new
+segments, and the index is replaced atomically after a segment is on disk.
+A new segment is indexed as uncommitted and marked committed once its rows
+have been deleted from the table. If a run dies in between, the next run
+deletes the hot rows that match the uncommitted segment's rows on (id,
+incident id, timestamp) and marks it committed. Readers skip hot rows that
+are also in an uncommitted segment in the meantime.
+
+Archived logs keep their ids, so ``log`` and ``incident`` ids must never be
+reused. The models declare AUTOINCREMENT for SQLite; databases created before
+that are rebuilt with ``flask upgrade-log-ids``.
+"""
+import fcntl
+import gzip
+import heapq
+import json
+import logging
+import mmap
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask import current_app
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from extensions import db
+from models import Incident, IncidentStatus, Log
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'index.json'
+LOCK_FILE = '.lock'
+
+
+def serialize_log(log):
+    """Same shape as the /api/logs response"""
+    return {
+        'id': log.id,
+        'incident_id': log.incident_id,
+        'timestamp': log.timestamp.isoformat() if log.timestamp else None,
+        'level': log.level,
+        'message': log.message,
+        'source': log.source,
+        'metadata': log.log_metadata
+    }
+
+
+def _parse_timestamp(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def parse_time_args(args):
+    """`since` / `until` request args as naive UTC datetimes (how timestamps are stored)
+
+    Raises ValueError for values that are not ISO 8601.
+    """
+    bounds = []
+    for name in ('since', 'until'):
+        value = datetime.fromisoformat(args[name]) if name in args else None
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        bounds.append(value)
+    return tuple(bounds)
+
+
+def log_key(row):
+    # Ids alone are not enough on databases created before AUTOINCREMENT
+    return row['id'], row['incident_id'], row['timestamp']
+
+
+def _overlaps(low, high, start, end):
+    """Whether [low, high] intersects [start, end]; None bounds are open"""
+    if start is not None and (high is None or high < start):
+        return False
+    if end is not None and (low is None or low > end):
+        return False
+    return True
+
+
+class LogArchive:
+    def __init__(self, directory, block_rows=1000):
+        self.directory = directory
+        self.block_rows = block_rows
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self._index = None
+        self._index_mtime = None
+        self._index_lock = threading.Lock()
+
+    def index(self):
+        """Segment index, reloaded when another process has replaced it"""
+        with self._index_lock:
+            try:
+                mtime = os.stat(self.index_path).st_mtime_ns
+            except FileNotFoundError:
+                return {'segments': []}
+            if mtime != self._index_mtime:
+                with open(self.index_path) as f:
+                    self._index = json.load(f)
+                self._index_mtime = mtime
+            return self._index
+
+    def _save_index(self, index):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+
+    def lock(self, blocking=False):
+        """Exclusive lock on the archive directory, or None if another process holds it"""
+        os.makedirs(self.directory, exist_ok=True)
+        handle = open(os.path.join(self.directory, LOCK_FILE), 'w')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            handle.close()
+            return None
+        return handle
+
+    def write_segment(self, rows):
+        """Write serialized log rows as a new segment; caller holds the lock"""
+        rows = sorted(rows, key=lambda row: (row['incident_id'], row['timestamp'] or ''))
+        index = dict(self.index())
+        segments = list(index.get('segments', []))
+        sequence = segments[-1]['sequence'] + 1 if segments else 1
+        filename = f'segment-{sequence:06d}.ndjson.gz'
+        path = os.path.join(self.directory, filename)
+
+        blocks = []
+        offset = 0
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            for start in range(0, len(rows), self.block_rows):
+                block_rows = rows[start:start + self.block_rows]
+                payload = ''.join(json.dumps(row, separators=(',', ':')) + '\n' for row in block_rows)
+                compressed = gzip.compress(payload.encode(), compresslevel=6)
+                f.write(compressed)
+                timestamps = [row['timestamp'] for row in block_rows if row['timestamp']]
+                blocks.append({
+                    'offset': offset,
+                    'length': len(compressed),
+                    'rows': len(block_rows),
+                    'min_incident_id': block_rows[0]['incident_id'],
+                    'max_incident_id': block_rows[-1]['incident_id'],
+                    'min_timestamp': min(timestamps) if timestamps else None,
+                    'max_timestamp': max(timestamps) if timestamps else None
+                })
+                offset += len(compressed)
+            f.flush()
+            os.fsync(f.fileno())
+        # A file left by a run that died before indexing it was never read; replace it
+        os.replace(tmp_path, path)
+
+        timestamps = [block['min_timestamp'] for block in blocks if block['min_timestamp']]
+        timestamps += [block['max_timestamp'] for block in blocks if block['max_timestamp']]
+        segment = {
+            'sequence': sequence,
+            'file': filename,
+            'rows': len(rows),
+            'bytes': offset,
+            'min_incident_id': rows[0]['incident_id'],
+            'max_incident_id': rows[-1]['incident_id'],
+            'max_id': max(row['id'] for row in rows),
+            'min_timestamp': min(timestamps) if timestamps else None,
+            'max_timestamp': max(timestamps) if timestamps else None,
+            'created_at': datetime.utcnow().isoformat(),
+            # Set once the rows are deleted from the table
+            'committed': False,
+            'blocks': blocks
+        }
+        segments.append(segment)
+        index['segments'] = segments
+        self._save_index(index)
+        return segment
+
+    def mark_committed(self, segment):
+        """Record that the segment's rows are gone from the table; caller holds the lock"""
+        index = dict(self.index())
+        index['segments'] = [dict(entry, committed=True) if entry['sequence'] == segment['sequence'] else entry
+                             for entry in index.get('segments', [])]
+        self._save_index(index)
+
+    def uncommitted(self):
+        """Segments whose rows may still be in the table"""
+        # Segments indexed before the flag existed were always deleted first
+        return [segment for segment in self.index().get('segments', []) if not segment.get('committed', True)]
+
+    def pending_keys(self):
+        """log_key of every row in an uncommitted segment"""
+        return {log_key(row) for segment in self.uncommitted() for row in self.iter_segment(segment)}
+
+    def iter_logs(self, incident_id=None, since=None, until=None):
+        """Yield archived log dicts matching the filters, segment by segment"""
+        for segment in self.index().get('segments', []):
+            if self._matches(segment, incident_id, since, until):
+                yield from self.iter_segment(segment, incident_id, since, until)
+
+    def iter_incident_range(self, low, high):
+        """Yield archived logs of incidents low..high ordered by incident id
+
+        Each segment is read once, decompressing only blocks in range, and the
+        segments (each sorted by incident id) are merged.
+        """
+        streams = [self._iter_segment_range(segment, low, high)
+                   for segment in self.index().get('segments', [])
+                   if segment['min_incident_id'] <= high and segment['max_incident_id'] >= low]
+        return heapq.merge(*streams, key=lambda row: row['incident_id'])
+
+    def _iter_segment_range(self, segment, low, high):
+        path = os.path.join(self.directory, segment['file'])
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for block in segment['blocks']:
+                if block['max_incident_id'] < low or block['min_incident_id'] > high:
+                    continue
+                data = gzip.decompress(mapped[block['offset']:block['offset'] + block['length']])
+                for line in data.splitlines():
+                    row = json.loads(line)
+                    if low <= row['incident_id'] <= high:
+                        yield row
+
+    def iter_segment(self, segment, incident_id=None, since=None, until=None):
+        """Yield the rows of one segment, decompressing only matching blocks"""
+        path = os.path.join(self.directory, segment['file'])
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for block in segment['blocks']:
+                if not self._matches(block, incident_id, since, until):
+                    continue
+                data = gzip.decompress(mapped[block['offset']:block['offset'] + block['length']])
+                for line in data.splitlines():
+                    row = json.loads(line)
+                    if incident_id is not None and row['incident_id'] != incident_id:
+                        continue
+                    if since is not None or until is not None:
+                        timestamp = _parse_timestamp(row['timestamp'])
+                        if timestamp is None or not _overlaps(timestamp, timestamp, since, until):
+                            continue
+                    yield row
+
+    @staticmethod
+    def _matches(entry, incident_id, since, until):
+        if incident_id is not None and not (entry['min_incident_id'] <= incident_id <= entry['max_incident_id']):
+            return False
+        return _overlaps(_parse_timestamp(entry['min_timestamp']), _parse_timestamp(entry['max_timestamp']),
+                         since, until)
+
+    def stats(self):
+        segments = self.index().get('segments', [])
+        return {
+            'segments': len(segments),
+            'rows': sum(segment['rows'] for segment in segments),
+            'bytes': sum(segment['bytes'] for segment in segments)
+        }
+
+
+def _archive_candidates(max_age_days, include_resolved):
+    conditions = []
+    if max_age_days is not None:
+        conditions.append(Log.timestamp < datetime.utcnow() - timedelta(days=max_age_days))
+    if include_resolved:
+        resolved = db.session.query(Incident.id).filter(Incident.status == IncidentStatus.RESOLVED)
+        conditions.append(Log.incident_id.in_(resolved))
+    return db.or_(*conditions) if conditions else None
+
+
+def _delete_logs(ids):
+    for start in range(0, len(ids), 500):
+        Log.query.filter(Log.id.in_(ids[start:start + 500])).delete(synchronize_session=False)
+
+
+def _delete_archived_rows(rows):
+    """Delete hot rows that are the same logs as archived `rows`, not just the same ids"""
+    keys = {log_key(row): row['id'] for row in rows}
+    ids = list(keys.values())
+    for start in range(0, len(ids), 500):
+        logs = Log.query.filter(Log.id.in_(ids[start:start + 500])).all()
+        _delete_logs([log.id for log in logs if log_key(serialize_log(log)) in keys])
+
+
+def archive_logs(archive, max_age_days=30, include_resolved=True, segment_rows=100_000):
+    """Move matching logs from the hot table into archive segments
+
+    Runs inside an app context. Returns the number of rows archived, or None if
+    another process is already archiving.
+    """
+    condition = _archive_candidates(max_age_days, include_resolved)
+    if condition is None:
+        return 0
+
+    lock = archive.lock()
+    if lock is None:
+        return None
+
+    archived = 0
+    last_id = 0
+    try:
+        # Finish a run that died after writing a segment but before committing the delete
+        for segment in archive.uncommitted():
+            _delete_archived_rows(list(archive.iter_segment(segment)))
+            db.session.commit()
+            db.session.expunge_all()
+            archive.mark_committed(segment)
+
+        while True:
+            # Keyset pagination on the primary key keeps each batch cheap
+            logs = (Log.query.filter(Log.id > last_id, condition)
+                    .order_by(Log.id).limit(segment_rows).all())
+            if not logs:
+                break
+            last_id = logs[-1].id
+            rows = [serialize_log(log) for log in logs]
+            segment = archive.write_segment(rows)
+
+            _delete_logs([row['id'] for row in rows])
+            db.session.commit()
+            db.session.expunge_all()
+            archive.mark_committed(segment)
+
+            archived += len(rows)
+            logger.info("Archived logs", extra={'segment': segment['file'], 'rows': len(rows)})
+    finally:
+        db.session.rollback()
+        lock.close()
+    return archived
+
+
+def query_logs(incident_id=None, since=None, until=None, include_archived=False, limit=None):
+    """Logs newest first from the hot table, plus archive segments when asked
+
+    With `limit`, only the newest `limit` logs are returned, and archived rows
+    are streamed so at most `limit` of them are held at once.
+    """
+    query = Log.query
+    if incident_id is not None:
+        query = query.filter(Log.incident_id == incident_id)
+    if since is not None:
+        query = query.filter(Log.timestamp >= since)
+    if until is not None:
+        query = query.filter(Log.timestamp <= until)
+    query = query.order_by(Log.timestamp.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    rows = [serialize_log(log) for log in query.all()]
+    if not include_archived:
+        return rows
+
+    # A row can be in both tiers until an interrupted archive run is resolved
+    seen = {log_key(row) for row in rows}
+    archive = current_app.extensions['log_archive']
+    archived = (row for row in archive.iter_logs(incident_id, since, until) if log_key(row) not in seen)
+    if limit is not None:
+        archived = heapq.nlargest(limit, archived, key=lambda row: row['timestamp'] or '')
+    rows.extend(archived)
+    rows.sort(key=lambda row: row['timestamp'] or '', reverse=True)
+    return rows[:limit] if limit is not None else rows
+
+
+def _archived_max_ids(archive):
+    """Highest log id and incident id referenced by the archive"""
+    max_id = max_incident_id = 0
+    for segment in archive.index().get('segments', []):
+        max_incident_id = max(max_incident_id, segment['max_incident_id'])
+        if 'max_id' in segment:
+            max_id = max(max_id, segment['max_id'])
+        else:
+            max_id = max([max_id] + [row['id'] for row in archive.iter_segment(segment)])
+    return max_id, max_incident_id
+
+
+def upgrade_sqlite_ids(archive):
+    """Rebuild SQLite `incident` and `log` tables with AUTOINCREMENT
+
+    Follows SQLite's table rebuild procedure (create, copy, drop, rename) in one
+    transaction, and starts each id sequence above every id the archive still
+    refers to. Returns the names of the rebuilt tables.
+    """
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return []
+    max_archived_id, max_archived_incident_id = _archived_max_ids(archive)
+    floors = {Incident.__table__.name: max_archived_incident_id, Log.__table__.name: max_archived_id}
+
+    raw = engine.raw_connection()
+    connection = raw.driver_connection
+    isolation_level = connection.isolation_level
+    foreign_keys = connection.execute('PRAGMA foreign_keys').fetchone()[0]
+    try:
+        connection.isolation_level = None
+        # Must be set outside a transaction; dropping `incident` would otherwise cascade
+        connection.execute('PRAGMA foreign_keys=OFF')
+        connection.execute('BEGIN IMMEDIATE')
+        rebuilt = []
+        present = []
+        for table in (Incident.__table__, Log.__table__):
+            sql = connection.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table.name,)).fetchone()
+            if sql is None:
+                continue
+            present.append(table.name)
+            if 'AUTOINCREMENT' in sql[0].upper():
+                continue
+            create = str(CreateTable(table).compile(dialect=engine.dialect))
+            create = create.replace(f'CREATE TABLE {table.name} ', f'CREATE TABLE {table.name}_new ', 1)
+            columns = ', '.join(column.name for column in table.columns)
+            connection.execute(create)
+            connection.execute(f'INSERT INTO {table.name}_new ({columns}) SELECT {columns} FROM {table.name}')
+            connection.execute(f'DROP TABLE {table.name}')
+            connection.execute(f'ALTER TABLE {table.name}_new RENAME TO {table.name}')
+            for index in table.indexes:
+                connection.execute(str(CreateIndex(index).compile(dialect=engine.dialect)))
+            rebuilt.append(table.name)
+
+        for name in present:
+            floor = floors[name]
+            current = connection.execute(f'SELECT COALESCE(MAX(id), 0) FROM {name}').fetchone()[0]
+            sequence = connection.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (name,)).fetchone()
+            seq = max(floor, current, sequence[0] if sequence else 0)
+            connection.execute('DELETE FROM sqlite_sequence WHERE name = ?', (name,))
+            connection.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (name, seq))
+        connection.execute('COMMIT')
+    except Exception:
+        if connection.in_transaction:
+            connection.execute('ROLLBACK')
+        raise
+    finally:
+        connection.execute(f'PRAGMA foreign_keys={foreign_keys}')
+        connection.isolation_level = isolation_level
+        raw.close()
+    return rebuilt
+
+
+def _retention_loop(app, archive):
+    interval = app.config['LOG_RETENTION_INTERVAL']
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                archive_logs(
+                    archive,
+                    max_age_days=app.config['LOG_RETENTION_MAX_AGE_DAYS'],
+                    include_resolved=app.config['LOG_RETENTION_ARCHIVE_RESOLVED'],
+                    segment_rows=app.config['LOG_ARCHIVE_SEGMENT_ROWS'])
+            except Exception:
+                logger.exception("Log retention run failed")
+
+
+def init_log_retention(app):
+    """Attach the log archive, the `flask archive-logs` command and the retention thread"""
+    directory = app.config.get('LOG_ARCHIVE_DIR') or os.path.join(app.instance_path, 'log_archive')
+    archive = LogArchive(directory, block_rows=app.config['LOG_ARCHIVE_BLOCK_ROWS'])
+    app.extensions['log_archive'] = archive
+
+    @app.cli.command('archive-logs')
+    @click.option('--max-age-days', type=int, default=None, help='Override LOG_RETENTION_MAX_AGE_DAYS')
+    def archive_logs_command(max_age_days):
+        """Move old and resolved-incident logs into archive segments"""
+        count = archive_logs(
+            archive,
+            max_age_days=max_age_days if max_age_days is not None else app.config['LOG_RETENTION_MAX_AGE_DAYS'],
+            include_resolved=app.config['LOG_RETENTION_ARCHIVE_RESOLVED'],
+            segment_rows=app.config['LOG_ARCHIVE_SEGMENT_ROWS'])
+        if count is None:
+            click.echo('Another process is archiving logs')
+        else:
+            click.echo(f'Archived {count} logs; archive now {archive.stats()}')
+
+    @app.cli.command('upgrade-log-ids')
+    def upgrade_log_ids_command():
+        """Stop SQLite reusing incident and log ids (run once on databases created earlier)"""
+        lock = archive.lock(blocking=True)
+        try:
+            rebuilt = upgrade_sqlite_ids(archive)
+        finally:
+            lock.close()
+        click.echo(f'Rebuilt {", ".join(rebuilt)} with AUTOINCREMENT' if rebuilt else 'Nothing to upgrade')
+
+    if app.config.get('LOG_RETENTION_ENABLED'):
+        threading.Thread(target=_retention_loop, args=(app, archive), name='log-retention', daemon=True).start()
+    return archive
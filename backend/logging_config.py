@@ -0,0 +1,150 @@
+"""Non-blocking structured logging.
+
+Request and Deepgram callback threads only put records on a bounded queue; a
+background QueueListener thread formats them and does the stream I/O. When the
+queue is full records are dropped (and counted) rather than blocking the caller.
+
+Hot-path messages (one per audio chunk or transcript) go through RateLimiter so
+they are emitted at most once per interval per key, and session-scoped loggers
+attach a session_id field to every record.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+# Attributes present on every LogRecord; anything else was passed via `extra`
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, including `extra` fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'msg': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable format for local development, with `extra` fields appended"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def formatMessage(self, record):
+        line = super().formatMessage(record)
+        fields = ' '.join(f'{key}={value}' for key, value in record.__dict__.items()
+                          if key not in _RESERVED_ATTRS and not key.startswith('_'))
+        return f'{line} [{fields}]' if fields else line
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks and defers formatting to the listener thread"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Merge args into the message now (args may be mutated after the call
+        # returns) but leave exc_info for the writer thread to format. Work on
+        # a copy, as QueueHandler does, so other handlers see the original.
+        msg = record.getMessage()
+        record = copy.copy(record)
+        record.msg = msg
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RateLimiter:
+    """Allow at most one message per `interval` seconds for each key"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.state = {}  # key -> [last_emitted, suppressed]
+
+    def check(self, key):
+        """Return the number of suppressed messages if `key` may log now, else None"""
+        now = time.monotonic()
+        with self.lock:
+            state = self.state.get(key)
+            if state is None:
+                self.state[key] = [now, 0]
+                return 0
+            if now - state[0] >= self.interval:
+                suppressed = state[1]
+                state[0] = now
+                state[1] = 0
+                return suppressed
+            state[1] += 1
+            return None
+
+    def forget(self, key):
+        with self.lock:
+            self.state.pop(key, None)
+
+
+class SessionLogger(logging.LoggerAdapter):
+    """LoggerAdapter that adds session context fields to every record"""
+
+    def process(self, msg, kwargs):
+        kwargs['extra'] = {**self.extra, **kwargs.get('extra', {})}
+        return msg, kwargs
+
+
+def session_logger(logger, session_id, **fields):
+    return SessionLogger(logger, {'session_id': session_id, **fields})
+
+
+def configure_logging(level=None, fmt=None, queue_size=None):
+    """Route root logging through a background writer thread"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    level = level or os.getenv('LOG_LEVEL', 'INFO')
+    fmt = fmt or os.getenv('LOG_FORMAT', 'json')
+    queue_size = queue_size or int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    root = logging.getLogger()
+    root.handlers[:] = [NonBlockingQueueHandler(log_queue)]
+    root.setLevel(level.upper())
+    # werkzeug sets its logger to INFO unless a level is already configured,
+    # which would let access logs through regardless of LOG_LEVEL
+    logging.getLogger('werkzeug').setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
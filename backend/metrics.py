@@ -0,0 +1,235 @@
+"""Prometheus-format metrics for the Crisis Commune API.
+
+A small in-process registry rather than prometheus_client: recording a sample
+is a dict lookup and an add under a lock, so instrumenting the request path
+costs a few microseconds. Samples are rendered in the Prometheus text
+exposition format on GET /metrics.
+
+Each process keeps its own registry; when running several gunicorn workers,
+scrape each worker or aggregate at the collector.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Request latencies are dominated by SQLite and JSON serialisation; DB time and
+# Deepgram callbacks are expected to be an order of magnitude faster.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    metric_type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}']
+
+
+class Counter(Metric):
+    metric_type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.values = {}
+
+    def inc(self, amount=1, labels=()):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        lines = self.header()
+        with self.lock:
+            items = list(self.values.items())
+        for labels, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Gauge(Metric):
+    """Gauge whose value is read from a callback at scrape time"""
+    metric_type = 'gauge'
+
+    def __init__(self, name, documentation):
+        super().__init__(name, documentation)
+        self.function = None
+
+    def set_function(self, function):
+        self.function = function
+
+    def render(self):
+        lines = self.header()
+        try:
+            value = self.function() if self.function else 0
+        except Exception:
+            value = 0
+        lines.append(f'{self.name} {_format_value(value)}')
+        return lines
+
+
+class Histogram(Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self.series = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, labels=()):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = self.header()
+        with self.lock:
+            items = [(labels, list(series)) for labels, series in self.series.items()]
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}')
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_str} {_format_value(series[-1])}')
+            lines.append(f'{self.name}_count{label_str} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route', ('method', 'route')))
+REQUEST_COUNT = REGISTRY.register(Counter(
+    'http_requests_total', 'HTTP requests by route and status code', ('method', 'route', 'status')))
+REQUEST_DB_TIME = REGISTRY.register(Histogram(
+    'http_request_db_seconds', 'Time spent executing SQL per request', ('method', 'route'), FAST_BUCKETS))
+
+VOICE_ACTIVE_SESSIONS = REGISTRY.register(Gauge(
+    'voice_active_sessions', 'Open Deepgram voice sessions'))
+VOICE_TRANSCRIPT_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'voice_transcript_queue_depth', 'Transcript events waiting to be streamed'))
+VOICE_AUDIO_BYTES = REGISTRY.register(Counter(
+    'voice_audio_bytes_total', 'Audio bytes forwarded to Deepgram'))
+DEEPGRAM_CALLBACK_LATENCY = REGISTRY.register(Histogram(
+    'deepgram_callback_duration_seconds', 'Time spent handling Deepgram callbacks', ('event',), FAST_BUCKETS))
+VOICE_ADMISSION_IN_USE = REGISTRY.register(Gauge(
+    'voice_admission_sessions_in_use', 'Voice session slots held or reserved across workers'))
+VOICE_ADMISSION_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'voice_admission_queue_depth', 'New voice sessions waiting for a slot'))
+VOICE_ADMISSION_WAIT = REGISTRY.register(Histogram(
+    'voice_admission_wait_seconds', 'Time new voice sessions waited for a slot', ('priority',)))
+VOICE_ADMISSION_REJECTED = REGISTRY.register(Counter(
+    'voice_admission_rejected_total', 'Voice session starts turned away (queued, queue_full or shed)', ('reason', 'priority')))
+VOICE_AUDIO_THROTTLED = REGISTRY.register(Counter(
+    'voice_audio_throttled_total', 'Audio POSTs rejected by the per-session rate limit'))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _handle_error(exception_context):
+    """Discard the start time of a statement that raised"""
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('metrics_query_start'):
+        conn.info['metrics_query_start'].pop()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get('metrics_query_start')
+    if not start_times:
+        return
+    duration = time.perf_counter() - start_times.pop()
+    try:
+        g.metrics_db_time = g.get('metrics_db_time', 0.0) + duration
+    except RuntimeError:
+        # Outside an application context (CLI, background jobs)
+        pass
+
+
+def _start_timer():
+    g.metrics_start = time.perf_counter()
+
+
+def _record_request(response):
+    start = g.pop('metrics_start', None)
+    if start is None:
+        return response
+
+    # Label by URL rule, not raw path, so session ids don't explode cardinality
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    labels = (request.method, route)
+    REQUEST_LATENCY.observe(time.perf_counter() - start, labels)
+    REQUEST_COUNT.inc(1, (request.method, route, str(response.status_code)))
+    REQUEST_DB_TIME.observe(g.pop('metrics_db_time', 0.0), labels)
+    return response
+
+
+def metrics_view():
+    """Prometheus scrape endpoint"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
+def init_metrics(app):
+    """Instrument `app` and expose GET /metrics when METRICS_ENABLED is set"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view, methods=['GET'])
@@ -1,9 +1,7 @@
-from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from enum import Enum
 
-# This will be imported from app.py
-db = None
+from extensions import db
 
 class IncidentStatus(Enum):
     ACTIVE = "active"
@@ -16,6 +14,9 @@ class AgentStatus(Enum):
     BUSY = "busy"
 
 class Incident(db.Model):
+    # Never reuse ids: archived logs still refer to deleted incidents
+    __table_args__ = {'sqlite_autoincrement': True}
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=True)
@@ -44,9 +45,12 @@ class Agent(db.Model):
     responses = db.relationship('AgentResponse', backref='agent', lazy=True, cascade='all, delete-orphan')
 
 class Log(db.Model):
+    # Never reuse ids: archived logs keep theirs after leaving the table
+    __table_args__ = {'sqlite_autoincrement': True}
+
     id = db.Column(db.Integer, primary_key=True)
-    incident_id = db.Column(db.Integer, db.ForeignKey('incident.id'), nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    incident_id = db.Column(db.Integer, db.ForeignKey('incident.id'), nullable=False, index=True)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     level = db.Column(db.String(20), nullable=False)  # INFO, WARNING, ERROR, etc.
     message = db.Column(db.Text, nullable=False)
     source = db.Column(db.String(100), nullable=True)
@@ -54,7 +58,7 @@ class Log(db.Model):
 
 class AgentResponse(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    incident_id = db.Column(db.Integer, db.ForeignKey('incident.id'), nullable=False)
+    incident_id = db.Column(db.Integer, db.ForeignKey('incident.id'), nullable=False, index=True)
     agent_id = db.Column(db.Integer, db.ForeignKey('agent.id'), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     response_type = db.Column(db.String(50), nullable=False)  # text, action, recommendation, etc.
@@ -0,0 +1,208 @@
+"""Per-request SQLAlchemy query profiling and N+1 detection.
+
+Hooks SQLAlchemy engine events to count the statements each request runs,
+how long they spent in the database and which were slowest. Statements that
+repeat with identical SQL inside one request (typically a lazy relationship
+loaded inside a loop) are flagged as likely N+1 patterns.
+
+Enable with QUERY_PROFILER_ENABLED=true. Results are attached to responses as
+X-DB-* headers and kept in a rolling window served from /api/debug/queries.
+"""
+import heapq
+import threading
+import time
+from collections import deque
+
+from flask import g, has_request_context, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEBUG_ENDPOINT = '/api/debug/queries'
+
+
+class RequestProfile:
+    """Query statistics collected for a single request"""
+
+    __slots__ = ('method', 'path', 'started_at', 'query_count', 'db_time',
+                 'statements', 'slowest', 'slow_limit', 'status_code')
+
+    def __init__(self, method, path, slow_limit):
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.statements = {}  # statement -> [count, total_time]
+        self.slowest = []  # min-heap of (duration, statement)
+        self.slow_limit = slow_limit
+        self.status_code = None
+
+    def record(self, statement, duration):
+        self.query_count += 1
+        self.db_time += duration
+
+        stats = self.statements.get(statement)
+        if stats is None:
+            self.statements[statement] = [1, duration]
+        else:
+            stats[0] += 1
+            stats[1] += duration
+
+        if len(self.slowest) < self.slow_limit:
+            heapq.heappush(self.slowest, (duration, statement))
+        elif duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (duration, statement))
+
+    def n_plus_one_suspects(self, threshold):
+        """Statements repeated at least `threshold` times in this request"""
+        return [{
+            'statement': statement,
+            'count': count,
+            'total_ms': round(total * 1000, 3)
+        } for statement, (count, total) in self.statements.items() if count >= threshold]
+
+    def to_dict(self, threshold):
+        return {
+            'method': self.method,
+            'path': self.path,
+            'status': self.status_code,
+            'started_at': self.started_at,
+            'query_count': self.query_count,
+            'db_time_ms': round(self.db_time * 1000, 3),
+            'slowest': [{
+                'statement': statement,
+                'duration_ms': round(duration * 1000, 3)
+            } for duration, statement in sorted(self.slowest, reverse=True)],
+            'n_plus_one': self.n_plus_one_suspects(threshold)
+        }
+
+
+class QueryProfiler:
+    """Collects RequestProfile objects for every request handled by an app"""
+
+    def __init__(self, window_size=200, slow_query_count=5, n_plus_one_threshold=5, emit_headers=True):
+        self.slow_query_count = slow_query_count
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.emit_headers = emit_headers
+        self.window = deque(maxlen=window_size)
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        # Listeners are registered on the Engine class so every engine the
+        # app creates (including per-bind engines) is covered.
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(Engine, 'handle_error', _handle_error)
+
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+        app.add_url_rule(DEBUG_ENDPOINT, 'debug_queries', self.debug_view, methods=['GET'])
+        app.extensions['query_profiler'] = self
+
+    def start_request(self):
+        if request.path == DEBUG_ENDPOINT:
+            return
+        g.query_profile = RequestProfile(request.method, request.path, self.slow_query_count)
+
+    def finish_request(self, response):
+        profile = g.pop('query_profile', None)
+        if profile is None:
+            return response
+
+        profile.status_code = response.status_code
+        with self.lock:
+            self.window.append(profile)
+
+        if self.emit_headers:
+            suspects = sum(1 for count, _ in profile.statements.values()
+                           if count >= self.n_plus_one_threshold)
+            response.headers['X-DB-Query-Count'] = str(profile.query_count)
+            response.headers['X-DB-Time-Ms'] = f'{profile.db_time * 1000:.3f}'
+            response.headers['X-DB-N-Plus-One'] = str(suspects)
+        return response
+
+    def summary(self, profiles):
+        """Aggregate profiles by method and path"""
+        routes = {}
+        for profile in profiles:
+            key = f'{profile.method} {profile.path}'
+            entry = routes.setdefault(key, {
+                'requests': 0,
+                'total_queries': 0,
+                'max_queries': 0,
+                'total_db_ms': 0.0,
+                'n_plus_one_requests': 0
+            })
+            entry['requests'] += 1
+            entry['total_queries'] += profile.query_count
+            entry['max_queries'] = max(entry['max_queries'], profile.query_count)
+            entry['total_db_ms'] += profile.db_time * 1000
+            if profile.n_plus_one_suspects(self.n_plus_one_threshold):
+                entry['n_plus_one_requests'] += 1
+
+        return {key: {
+            'requests': entry['requests'],
+            'avg_queries': round(entry['total_queries'] / entry['requests'], 2),
+            'max_queries': entry['max_queries'],
+            'avg_db_ms': round(entry['total_db_ms'] / entry['requests'], 3),
+            'n_plus_one_requests': entry['n_plus_one_requests']
+        } for key, entry in routes.items()}
+
+    def debug_view(self):
+        """Return the rolling window of request profiles"""
+        limit = request.args.get('limit', type=int)
+        with self.lock:
+            profiles = list(self.window)
+
+        recent = profiles[::-1]
+        if limit:
+            recent = recent[:limit]
+
+        return jsonify({
+            'window_size': self.window.maxlen,
+            'n_plus_one_threshold': self.n_plus_one_threshold,
+            'summary': self.summary(profiles),
+            'requests': [profile.to_dict(self.n_plus_one_threshold) for profile in recent]
+        })
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context() or 'query_profile' not in g:
+        return
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    # so it isn't paired with a later statement on this pooled connection
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('query_start_time'):
+        conn.info['query_start_time'].pop()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get('query_start_time')
+    if not start_times:
+        return
+    duration = time.perf_counter() - start_times.pop()
+
+    if has_request_context():
+        profile = g.get('query_profile')
+        if profile is not None:
+            profile.record(statement, duration)
+
+
+def init_query_profiler(app):
+    """Attach the query profiler to `app` when QUERY_PROFILER_ENABLED is set"""
+    if not app.config.get('QUERY_PROFILER_ENABLED'):
+        return None
+
+    profiler = QueryProfiler(
+        window_size=app.config.get('QUERY_PROFILER_WINDOW', 200),
+        slow_query_count=app.config.get('QUERY_PROFILER_SLOW_QUERIES', 5),
+        n_plus_one_threshold=app.config.get('QUERY_PROFILER_N_PLUS_ONE_THRESHOLD', 5),
+        emit_headers=app.config.get('QUERY_PROFILER_HEADERS', True)
+    )
+    profiler.init_app(app)
+    return profiler
@@ -1,5 +1,7 @@
-from flask import Blueprint, request, jsonify
-from app import db, Incident, Agent, Log, AgentResponse, IncidentStatus, AgentStatus
+from flask import Blueprint, current_app, request, jsonify
+from extensions import db
+from models import Incident, Agent, Log, AgentResponse, IncidentStatus, AgentStatus
+from log_archive import parse_time_args, query_logs
 from datetime import datetime
 import json
 
@@ -174,17 +176,32 @@ def update_agent_status(agent_id):
 # Log routes
 @api.route('/logs', methods=['GET'])
 def get_logs():
-    """Get all logs"""
-    logs = Log.query.order_by(Log.timestamp.desc()).all()
-    return jsonify([{
-        'id': log.id,
-        'incident_id': log.incident_id,
-        'timestamp': log.timestamp.isoformat() if log.timestamp else None,
-        'level': log.level,
-        'message': log.message,
-        'source': log.source,
-        'metadata': log.log_metadata
-    } for log in logs])
+    """Get logs, optionally filtered by incident and time range
+
+    Pass include_archived=true to also read logs moved to archive segments.
+    Archived reads return at most `limit` logs (LOG_ARCHIVE_QUERY_LIMIT by default).
+    """
+    try:
+        since, until = parse_time_args(request.args)
+    except ValueError:
+        return jsonify({'error': 'since and until must be ISO 8601 timestamps'}), 400
+
+    include_archived = request.args.get('include_archived', 'false').lower() == 'true'
+    limit = request.args.get('limit', type=int)
+    if limit is not None and limit < 1:
+        return jsonify({'error': 'limit must be a positive integer'}), 400
+    if include_archived:
+        # The archive holds all of history; never read it into one unbounded list
+        limit = min(limit or current_app.config['LOG_ARCHIVE_QUERY_LIMIT'],
+                    current_app.config['LOG_ARCHIVE_QUERY_LIMIT'])
+
+    return jsonify(query_logs(
+        incident_id=request.args.get('incident_id', type=int),
+        since=since,
+        until=until,
+        include_archived=include_archived,
+        limit=limit
+    ))
 
 @api.route('/logs', methods=['POST'])
 def create_log():
@@ -196,7 +213,7 @@ def create_log():
         level=data.get('level'),
         message=data.get('message'),
         source=data.get('source'),
-        metadata=data.get('metadata')
+        log_metadata=data.get('metadata')
     )
     
     db.session.add(log)
@@ -239,7 +256,7 @@ def create_agent_response():
         response_type=data.get('response_type'),
         content=data.get('content'),
         confidence=data.get('confidence'),
-        metadata=data.get('metadata')
+        response_metadata=data.get('metadata')
     )
     
     db.session.add(response)
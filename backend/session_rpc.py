@@ -0,0 +1,231 @@
+"""Forward voice session calls to the worker that owns the session.
+
+Each worker that owns a voice session listens on a Unix socket. Its address
+is recorded as the session owner in the shared session store. Other workers
+send audio, transcript reads, listening-state changes and stop requests
+there. Messages are length-prefixed frames from multiprocessing.connection,
+authenticated with a key derived from SECRET_KEY: a JSON header and, for
+audio, one raw payload frame.
+
+Connecting and the authentication handshake run under kernel socket timeouts
+(VOICE_RPC_TIMEOUT), and the owner runs the handshake in the connection's own
+thread, so a stuck owner or caller cannot block the other side indefinitely.
+"""
+import atexit
+import hashlib
+import json
+import logging
+import os
+import socket
+import struct
+import tempfile
+import threading
+from multiprocessing.connection import Connection, answer_challenge, deliver_challenge
+
+from admission import AudioThrottled
+
+logger = logging.getLogger(__name__)
+
+
+class OwnerUnavailable(Exception):
+    """The owning worker could not be reached (it exited or restarted)"""
+
+
+class OwnerTimeout(OwnerUnavailable):
+    """The owning worker accepted the call but did not answer in time"""
+
+
+def _authkey():
+    secret = os.getenv('SECRET_KEY', 'dev-secret-key')
+    return hashlib.sha256(f'voice-session-rpc:{secret}'.encode()).digest()
+
+
+def _rpc_timeout():
+    return float(os.getenv('VOICE_RPC_TIMEOUT', '5'))
+
+
+def _set_timeouts(fileno, seconds):
+    """Bound every blocking send/recv on the socket; they fail with BlockingIOError (0 blocks forever)
+
+    Set on the descriptor rather than with settimeout(), which would make it
+    non-blocking under multiprocessing.connection's raw reads and writes.
+    """
+    timeval = struct.pack('ll', int(seconds), int(seconds % 1 * 1_000_000))
+    sock = socket.socket(fileno=fileno)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO, timeval)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDTIMEO, timeval)
+    finally:
+        sock.detach()
+
+
+class SessionRPCServer:
+    """Serves forwarded calls against this worker's DeepgramVoiceAgent"""
+
+    def __init__(self, agent, socket_dir=None):
+        self.agent = agent
+        self.socket_dir = socket_dir or os.getenv(
+            'VOICE_SOCKET_DIR', os.path.join(tempfile.gettempdir(), 'crisis-commune-voice'))
+        self.address = os.path.join(self.socket_dir, f'worker-{os.getpid()}.sock')
+        self.timeout = _rpc_timeout()
+        self.listener = None
+
+    def start(self):
+        os.makedirs(self.socket_dir, mode=0o700, exist_ok=True)
+        if os.path.exists(self.address):
+            # Left behind by an earlier process with the same pid
+            os.unlink(self.address)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.address)
+        self.listener.listen(socket.SOMAXCONN)
+        threading.Thread(target=self._accept_loop, name='voice-rpc-accept', daemon=True).start()
+        atexit.register(self.close)
+        logger.info("Voice session RPC listening", extra={'address': self.address})
+
+    def close(self):
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.close()
+            try:
+                os.unlink(self.address)
+            except FileNotFoundError:
+                pass
+
+    def _accept_loop(self):
+        # Only accept here: the handshake runs in the connection's thread, so a
+        # caller that stalls mid-handshake cannot hold up everyone else
+        while self.listener is not None:
+            try:
+                sock, _ = self.listener.accept()
+            except OSError:
+                if self.listener is None:
+                    return
+                logger.warning("Voice session RPC accept failed", exc_info=True)
+                continue
+            threading.Thread(target=self._serve, args=(sock,), name='voice-rpc', daemon=True).start()
+
+    def _handshake(self, sock):
+        """Authenticate the caller; returns the connection, or None if it failed or timed out"""
+        _set_timeouts(sock.fileno(), self.timeout)
+        connection = Connection(sock.detach())
+        try:
+            deliver_challenge(connection, _authkey())
+            answer_challenge(connection, _authkey())
+        except (OSError, EOFError) as e:
+            connection.close()
+            logger.warning("Voice session RPC handshake failed", extra={'error': str(e)})
+            return None
+        # Idle connections wait for their next call without a deadline
+        _set_timeouts(connection.fileno(), 0)
+        return connection
+
+    def _serve(self, sock):
+        connection = self._handshake(sock)
+        if connection is None:
+            return
+        with connection:
+            while True:
+                try:
+                    request = json.loads(connection.recv_bytes())
+                    payload = connection.recv_bytes() if request.get('has_payload') else None
+                except (OSError, EOFError):
+                    return
+                try:
+                    result = self._dispatch(request, payload)
+                    response = {'result': result}
+                except AudioThrottled as e:
+                    response = {'throttled': e.retry_after}
+                except Exception as e:
+                    logger.exception("Voice session RPC call failed", extra={'op': request.get('op')})
+                    response = {'error': str(e)}
+                try:
+                    connection.send_bytes(json.dumps(response).encode())
+                except (OSError, EOFError):
+                    return
+
+    def _dispatch(self, request, payload):
+        op = request['op']
+        session_id = request['session_id']
+        agent = self.agent
+        if op == 'send_audio':
+            return agent.send_audio(session_id, payload, forward=False)
+        if op == 'get_transcript':
+            return agent.get_transcript(session_id, forward=False)
+        if op == 'set_listening_state':
+            return agent.set_listening_state(session_id, request['is_listening'], forward=False)
+        if op == 'finish_connection':
+            return agent.finish_connection(session_id, forward=False)
+        raise ValueError(f'Unknown op: {op}')
+
+
+class SessionRPCClient:
+    """Calls owner workers, reusing one connection per owner per thread"""
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout if timeout is not None else _rpc_timeout()
+        self.local = threading.local()
+
+    def _connect(self, address):
+        """Connect and authenticate, each blocking step bounded by the timeout"""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            _set_timeouts(sock.fileno(), self.timeout)
+            sock.connect(address)
+        except OSError:
+            sock.close()
+            raise
+        connection = Connection(sock.detach())
+        try:
+            answer_challenge(connection, _authkey())
+            deliver_challenge(connection, _authkey())
+        except BaseException:
+            connection.close()
+            raise
+        return connection
+
+    def _connection(self, address):
+        connections = getattr(self.local, 'connections', None)
+        if connections is None:
+            connections = self.local.connections = {}
+        connection = connections.get(address)
+        if connection is None:
+            try:
+                connection = self._connect(address)
+            except BlockingIOError as e:
+                # Connected (or queued) but the owner never completed the handshake
+                raise OwnerTimeout(address) from e
+            except (OSError, EOFError) as e:
+                raise OwnerUnavailable(address) from e
+            connections[address] = connection
+        return connection
+
+    def _drop(self, address):
+        connection = self.local.connections.pop(address, None)
+        if connection is not None:
+            connection.close()
+
+    def call(self, address, op, session_id, payload=None, **kwargs):
+        request = {'op': op, 'session_id': session_id, 'has_payload': payload is not None, **kwargs}
+        connection = self._connection(address)
+        try:
+            connection.send_bytes(json.dumps(request).encode())
+            if payload is not None:
+                connection.send_bytes(payload)
+            if not connection.poll(self.timeout):
+                # The reply may still arrive; the connection can't be reused
+                self._drop(address)
+                raise OwnerTimeout(address)
+            response = json.loads(connection.recv_bytes())
+        except BlockingIOError as e:
+            # A send or a partial reply outlasted the socket timeout
+            self._drop(address)
+            raise OwnerTimeout(address) from e
+        except (OSError, EOFError) as e:
+            self._drop(address)
+            raise OwnerUnavailable(address) from e
+
+        if 'throttled' in response:
+            raise AudioThrottled(response['throttled'])
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        return response['result']
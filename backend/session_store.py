@@ -0,0 +1,219 @@
+"""Voice session registry and transcript event bus.
+
+DeepgramVoiceAgent keeps the live Deepgram connection for a session in the
+worker that started it (the owner). The session store records which worker
+owns each session, so other workers can forward audio and transcript reads
+to it. It also carries transcript events to /api/voice/transcript-stream
+readers in any worker.
+
+Two implementations, selected with VOICE_SESSION_STORE:
+
+- ``local`` (default): a single process. Ownership is implicit and events
+  go through an in-memory queue, as before.
+- ``sqlite``: a SQLite file in WAL mode shared by every worker on the host,
+  for gunicorn with more than one worker.
+
+Both also hold the voice admission state (see admission.py), so the session
+budget and wait queue are shared by every worker using the store.
+"""
+import copy
+import json
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+
+class SessionExists(Exception):
+    """Another worker already owns this session id"""
+
+
+class LocalSessionStore:
+    """Single-process store backed by an in-memory queue"""
+
+    shared = False
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.admission_lock = threading.Lock()
+        self.admission = {}
+
+    @contextmanager
+    def admission_state(self):
+        """Admission state dict, modified in place under a lock"""
+        with self.admission_lock:
+            yield self.admission
+
+    def read_admission_state(self):
+        """Copy of the admission state, for reporting"""
+        with self.admission_lock:
+            return copy.deepcopy(self.admission)
+
+    def register(self, session_id, owner):
+        pass
+
+    def owner(self, session_id):
+        return None
+
+    def remove(self, session_id, owner=None):
+        pass
+
+    def publish(self, event):
+        self.queue.put(event)
+
+    def queue_depth(self):
+        return self.queue.qsize()
+
+    def stream(self, idle_timeout=1.0):
+        """Yield transcript events, or None after `idle_timeout` seconds without one"""
+        while True:
+            try:
+                yield self.queue.get(timeout=idle_timeout)
+            except queue.Empty:
+                yield None
+
+
+class SqliteSessionStore:
+    """Session registry and event log in a SQLite file shared by local workers"""
+
+    shared = True
+
+    def __init__(self, path, event_ttl=60.0, poll_interval=0.05):
+        self.path = path
+        self.event_ttl = event_ttl
+        self.poll_interval = poll_interval
+        self.local = threading.local()
+        self.last_prune = 0.0
+        self.prune_lock = threading.Lock()
+
+        connection = self._connection()
+        connection.executescript('''
+            CREATE TABLE IF NOT EXISTS voice_session (
+                session_id TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS transcript_event (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_transcript_event_created_at ON transcript_event (created_at);
+            CREATE TABLE IF NOT EXISTS admission_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                state TEXT NOT NULL
+            );
+        ''')
+
+    def _connection(self):
+        # sqlite3 connections must not cross threads or forks (gunicorn --preload)
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+
+    def register(self, session_id, owner):
+        """Claim `session_id` for `owner`; raises SessionExists if it is taken"""
+        try:
+            self._connection().execute(
+                'INSERT INTO voice_session (session_id, owner, created_at) VALUES (?, ?, ?)',
+                (session_id, owner, time.time()))
+        except sqlite3.IntegrityError as e:
+            raise SessionExists(session_id) from e
+
+    @contextmanager
+    def admission_state(self):
+        """Admission state dict, read and written back in one IMMEDIATE transaction"""
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute('SELECT state FROM admission_state WHERE id = 1').fetchone()
+            state = json.loads(row[0]) if row else {}
+            yield state
+            connection.execute('INSERT OR REPLACE INTO admission_state (id, state) VALUES (1, ?)',
+                               (json.dumps(state),))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def read_admission_state(self):
+        """Admission state as last written, without taking the write lock"""
+        row = self._connection().execute('SELECT state FROM admission_state WHERE id = 1').fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def owner(self, session_id):
+        row = self._connection().execute(
+            'SELECT owner FROM voice_session WHERE session_id = ?', (session_id,)).fetchone()
+        return row[0] if row else None
+
+    def remove(self, session_id, owner=None):
+        if owner is None:
+            self._connection().execute('DELETE FROM voice_session WHERE session_id = ?', (session_id,))
+        else:
+            self._connection().execute(
+                'DELETE FROM voice_session WHERE session_id = ? AND owner = ?', (session_id, owner))
+
+    def remove_owner(self, owner):
+        """Drop every session registered to `owner` (a worker that is shutting down)"""
+        self._connection().execute('DELETE FROM voice_session WHERE owner = ?', (owner,))
+
+    def publish(self, event):
+        now = time.time()
+        connection = self._connection()
+        connection.execute(
+            'INSERT INTO transcript_event (session_id, payload, created_at) VALUES (?, ?, ?)',
+            (event.get('session_id'), json.dumps(event), now))
+        self._prune(connection, now)
+
+    def _prune(self, connection, now):
+        if now - self.last_prune < self.event_ttl / 4:
+            return
+        with self.prune_lock:
+            if now - self.last_prune < self.event_ttl / 4:
+                return
+            self.last_prune = now
+        connection.execute('DELETE FROM transcript_event WHERE created_at < ?', (now - self.event_ttl,))
+
+    def queue_depth(self):
+        """Events still retained on the bus (within event_ttl)"""
+        return self._connection().execute('SELECT COUNT(*) FROM transcript_event').fetchone()[0]
+
+    def stream(self, idle_timeout=1.0):
+        """Yield events published after the call, or None after `idle_timeout` seconds without one"""
+        connection = self._connection()
+        last_id = connection.execute('SELECT COALESCE(MAX(id), 0) FROM transcript_event').fetchone()[0]
+        idle_since = time.monotonic()
+        while True:
+            rows = connection.execute(
+                'SELECT id, payload FROM transcript_event WHERE id > ? ORDER BY id LIMIT 100',
+                (last_id,)).fetchall()
+            for row_id, payload in rows:
+                last_id = row_id
+                yield json.loads(payload)
+            if rows:
+                idle_since = time.monotonic()
+                continue
+            if time.monotonic() - idle_since >= idle_timeout:
+                idle_since = time.monotonic()
+                yield None
+            time.sleep(self.poll_interval)
+
+
+def create_session_store(kind=None, path=None):
+    """Build the store selected by VOICE_SESSION_STORE"""
+    kind = kind or os.getenv('VOICE_SESSION_STORE', 'local')
+    if kind == 'local':
+        return LocalSessionStore()
+    if kind == 'sqlite':
+        path = path or os.getenv('VOICE_SESSION_DB', os.path.join(tempfile.gettempdir(), 'crisis_commune_voice.db'))
+        return SqliteSessionStore(path, event_ttl=float(os.getenv('VOICE_EVENT_TTL', '60')))
+    raise ValueError(f'Unknown VOICE_SESSION_STORE: {kind}')
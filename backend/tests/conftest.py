@@ -0,0 +1,28 @@
+import os
+import sys
+
+# Modules are imported flat from backend/, as the app does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Importing app builds the module-level app; keep it off disk and off the voice stack
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('VOICE_ENABLED', 'false')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import pytest
+
+
+@pytest.fixture
+def app(tmp_path):
+    from app import create_app
+    from extensions import db
+
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "test.db"}',
+        'LOG_ARCHIVE_DIR': str(tmp_path / 'log_archive'),
+        'LOG_ARCHIVE_BLOCK_ROWS': 3,
+        'VOICE_ENABLED': False,
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+from extensions import db
+from models import Incident
+
+
+def _ndjson(*records):
+    return ''.join(json.dumps(record) + '\n' for record in records).encode()
+
+
+@pytest.mark.parametrize('bad', [
+    [1, 2],
+    {'type': 'incident', 'id': 2, 'title': 'Flood', 'priority': [1]},
+    {'type': 'log', 'incident_id': [1], 'level': 'INFO', 'message': 'm'},
+    {'type': 'log', 'incident_id': 1, 'timestamp': 5, 'level': 'INFO', 'message': 'm'},
+])
+def test_import_rejects_mistyped_records_with_committed_ids(app, bad):
+    app.config['IMPORT_CHUNK_ROWS'] = 1
+    body = _ndjson({'type': 'incident', 'id': 1, 'title': 'Fire', 'description': 'd', 'location': 'x'}, bad)
+
+    response = app.test_client().post('/api/incidents/import', data=body, content_type='application/x-ndjson')
+
+    assert response.status_code == 400
+    assert response.json['record'] == 2
+    assert response.json['imported']['incidents'] == 1
+    new_id = response.json['incident_ids']['1']
+    assert db.session.get(Incident, new_id).title == 'Fire'
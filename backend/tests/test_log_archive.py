@@ -0,0 +1,79 @@
+import os
+from datetime import datetime, timedelta
+
+from extensions import db
+from log_archive import archive_logs, query_logs, serialize_log
+from models import Incident, Log
+
+
+def _seed(count, age_days=0):
+    incident = Incident(title='Fire', description='Smoke reported', location='Market St', priority=1)
+    db.session.add(incident)
+    db.session.commit()
+    timestamp = datetime.utcnow() - timedelta(days=age_days)
+    for n in range(count):
+        db.session.add(Log(incident_id=incident.id, level='INFO', message=f'log {n}', source='test',
+                           timestamp=timestamp + timedelta(seconds=n)))
+    db.session.commit()
+    return incident.id
+
+
+def _write_uncommitted(archive, rows):
+    """Index a segment the way a run that died before its delete leaves it"""
+    lock = archive.lock()
+    try:
+        return archive.write_segment(rows)
+    finally:
+        lock.close()
+
+
+def test_unindexed_segment_file_does_not_block_archiving(app):
+    archive = app.extensions['log_archive']
+    _seed(5, age_days=40)
+    # A run died after creating the segment file but before saving the index
+    os.makedirs(archive.directory, exist_ok=True)
+    with open(os.path.join(archive.directory, 'segment-000001.ndjson.gz'), 'wb') as f:
+        f.write(b'partial')
+
+    assert archive_logs(archive, max_age_days=30, include_resolved=False) == 5
+    assert archive_logs(archive, max_age_days=30, include_resolved=False) == 0
+    assert Log.query.count() == 0
+    assert len(list(archive.iter_logs())) == 5
+
+
+def test_uncommitted_segment_recovery_keeps_reused_ids(app):
+    archive = app.extensions['log_archive']
+    incident_id = _seed(3)
+    rows = [serialize_log(log) for log in Log.query.order_by(Log.id).all()]
+    segment = _write_uncommitted(archive, rows[:2])
+    assert [s['sequence'] for s in archive.uncommitted()] == [segment['sequence']]
+
+    # The first pending row's id has since been taken by a different log
+    Log.query.filter_by(id=rows[0]['id']).delete()
+    db.session.add(Log(id=rows[0]['id'], incident_id=incident_id, level='INFO', message='reused', source='test'))
+    db.session.commit()
+
+    assert archive_logs(archive, max_age_days=30, include_resolved=False) == 0
+    assert archive.uncommitted() == []
+    assert sorted(log.message for log in Log.query.all()) == ['log 2', 'reused']
+
+
+def test_pending_rows_are_returned_once(app):
+    archive = app.extensions['log_archive']
+    incident_id = _seed(3)
+    rows = [serialize_log(log) for log in Log.query.order_by(Log.id).all()]
+    _write_uncommitted(archive, rows[:2])
+
+    logs = query_logs(incident_id=incident_id, include_archived=True)
+    assert sorted(log['message'] for log in logs) == ['log 0', 'log 1', 'log 2']
+
+
+def test_archived_query_keeps_the_newest_limit_logs(app):
+    archive = app.extensions['log_archive']
+    incident_id = _seed(6, age_days=40)
+    archive_logs(archive, max_age_days=30, include_resolved=False)
+    _seed(2)
+
+    logs = query_logs(include_archived=True, limit=4)
+    assert [log['message'] for log in logs] == ['log 1', 'log 0', 'log 5', 'log 4']
+    assert all(log['incident_id'] == incident_id for log in logs[2:])